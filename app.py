@@ -10,6 +10,7 @@ from src.config.config import Config
 from src.services.tts_service import TTSService
 from src.routes import create_routes
 from src.utils import cleanup_temp_files
+from src.server import production_server_available, run_production_server
 import atexit
 
 
@@ -28,13 +29,16 @@ def create_app():
     return app
 
 
-def initialize_services():
+def initialize_services(tts_service):
     """
     Initialize all services required by the application.
     This function is now used for cleanup only.
+    
+    Args:
+        tts_service (TTSService): TTS service instance
     """
-    # Clean up any leftover files on startup
-    cleanup_temp_files()
+    # Clean up any leftover files on the background writer thread
+    tts_service.output_writer.submit(cleanup_temp_files)
 
 
 def register_routes(app, tts_service):
@@ -58,6 +62,7 @@ def setup_cleanup_handlers(tts_service):
     """
     def cleanup():
         print("Performing cleanup on shutdown...")
+        tts_service.shutdown()  # Finish pending file writes first
         cleanup_temp_files()
         print("Cleanup completed.")
     
@@ -70,23 +75,28 @@ def main():
         # Create Flask app
         app = create_app()
         
-        # Initialize cleanup
-        initialize_services()
-        
         # Create TTS service with immediate loading for faster first request
         # Set lazy_load=True if you prefer faster startup but slower first request
         tts_service = TTSService(lazy_load=Config.LAZY_LOAD_MODEL)
         
+        # Initialize cleanup
+        initialize_services(tts_service)
+        
         # Register routes
         register_routes(app, tts_service)
         
         # Setup cleanup handlers
         setup_cleanup_handlers(tts_service)
         
+        # Pre-render known phrases in the background; does not delay startup
+        if Config.WARMUP_MANIFEST:
+            tts_service.start_cache_warmup(Config.WARMUP_MANIFEST)
+        
         print(f"\n{'='*50}")
         print("🎤 ChatterboxTTS Web Application")
         print(f"{'='*50}")
         print(f"Server: http://{Config.HOST}:{Config.PORT}")
+        print(f"Server mode: {Config.SERVER_MODE}")
         print(f"Debug mode: {Config.DEBUG}")
         print(f"Max text length: {Config.MAX_TEXT_LENGTH} characters")
         print(f"Output directory: {Config.OUTPUT_DIR}/")
@@ -97,6 +107,12 @@ def main():
         print(f"{'='*50}\n")
         
         # Run the application
+        if Config.SERVER_MODE == 'production':
+            if production_server_available():
+                run_production_server(app, tts_service)
+                return
+            print("Warning: uvicorn/a2wsgi not installed; falling back to the development server")
+        
         app.run(
             debug=Config.DEBUG,
             host=Config.HOST,
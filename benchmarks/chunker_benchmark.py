@@ -0,0 +1,117 @@
+"""
+Microbenchmark and property checks for the text chunker in src/utils.py.
+
+Generates a synthetic multi-megabyte corpus (abbreviations, decimals,
+initials, long comma-separated sentences, paragraph breaks and over-long
+words), chunks it with iter_text_chunks and reports throughput and the
+spread of chunk sizes. The run fails if any chunking invariant is broken.
+
+    python benchmarks/chunker_benchmark.py --megabytes 4
+"""
+
+import argparse
+import os
+import random
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from src.utils import iter_sentences, iter_text_chunks  # noqa: E402
+
+
+SENTENCES = [
+    'Dr. Smith measured 3.5 liters at 10.25 a.m. on the dot.',
+    'Mr. and Mrs. Jones visited St. Louis in Sept. last year!',
+    'Was it J. R. R. Tolkien who wrote that?',
+    'The results, e.g. the ones in Fig. 4, were clear.',
+    'Short.',
+    'It rained.',
+    ('This sentence keeps going, with clause after clause, listing apples, pears, plums, '
+     'cherries, grapes, melons, figs and dates, until it is well past any reasonable chunk '
+     'size; then it continues: more words, more clauses, and still more words to read.'),
+    'Pneumonoultramicroscopicsilicovolcanoconiosis' * 6 + '.',
+]
+
+# Texts whose sentence boundaries are known, with the expected sentences
+SENTENCE_CASES = [
+    ('Plan B. Then plan C.', ['Plan B.', 'Then plan C.']),
+    ('I was born in the U.S. She was not.', ['I was born in the U.S.', 'She was not.']),
+    ('Call me at 5 p.m. Tomorrow we go.', ['Call me at 5 p.m.', 'Tomorrow we go.']),
+    ('Was it J. R. R. Tolkien who wrote that? Yes.', ['Was it J. R. R. Tolkien who wrote that?', 'Yes.']),
+    ('Dr. Smith left at 3.5 p.m. on the dot. Then e.g. rain.',
+     ['Dr. Smith left at 3.5 p.m. on the dot.', 'Then e.g. rain.']),
+]
+
+
+def build_corpus(megabytes, seed=0):
+    """Build a random corpus of roughly the given size."""
+    rng = random.Random(seed)
+    target = int(megabytes * 1024 * 1024)
+    parts, size = [], 0
+    while size < target:
+        sentence = rng.choice(SENTENCES)
+        sep = '\n\n' if rng.random() < 0.05 else ' '
+        parts.append(sentence + sep)
+        size += len(sentence) + len(sep)
+    return ''.join(parts)
+
+
+def check_chunks(text, chunks, max_cost, pack):
+    """Assert the chunking invariants; returns the number of chunks checked."""
+    # Nothing is lost, duplicated or reordered
+    assert ' '.join(chunks).split() == text.split(), 'words changed'
+
+    for chunk in chunks:
+        assert chunk and chunk == chunk.strip(), 'empty or unstripped chunk'
+        # Only a single word may exceed the budget
+        assert len(chunk) <= max_cost or ' ' not in chunk, f'chunk over budget: {len(chunk)}'
+
+    if not pack:
+        # Unpacked chunks never span two sentences
+        sentence_ends = sum(1 for _ in iter_sentences(text))
+        assert len(chunks) >= sentence_ends, 'sentences were merged'
+
+    # Abbreviations and decimals never end a chunk
+    for chunk in chunks:
+        assert not chunk.endswith(('Dr.', 'Mr.', 'Mrs.', 'St.', 'Sept.', 'Fig.', ' 3.')), chunk
+    return len(chunks)
+
+
+def check_sentences():
+    """Assert that every SENTENCE_CASES text splits into its expected sentences."""
+    for text, expected in SENTENCE_CASES:
+        sentences = list(iter_sentences(text))
+        assert sentences == expected, f'{text!r} split as {sentences}'
+
+
+def run(megabytes, max_cost):
+    check_sentences()
+    text = build_corpus(megabytes)
+    print(f"Corpus: {len(text) / 1024 / 1024:.2f} MB, chunk budget {max_cost} characters")
+
+    for pack in (True, False):
+        start = time.perf_counter()
+        chunks = list(iter_text_chunks(text, max_cost, pack=pack))
+        elapsed = time.perf_counter() - start
+
+        sizes = [len(chunk) for chunk in chunks]
+        check_chunks(text, chunks, max_cost, pack)
+        print(f"pack={pack!s:5}  {len(text) / 1024 / 1024 / elapsed:7.2f} MB/s  "
+              f"{len(chunks):8d} chunks  mean {statistics.mean(sizes):6.1f}  "
+              f"stdev {statistics.pstdev(sizes):6.1f}  min {min(sizes)}  max {max(sizes)}")
+
+    print("All chunking invariants hold")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark the TTS text chunker.')
+    parser.add_argument('--megabytes', type=float, default=4.0, help='Corpus size (default 4)')
+    parser.add_argument('--max-cost', type=int, default=200, help='Chunk budget in characters')
+    args = parser.parse_args()
+    run(args.megabytes, args.max_cost)
+
+
+if __name__ == '__main__':
+    main()
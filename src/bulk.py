@@ -0,0 +1,285 @@
+"""
+Offline bulk synthesis.
+
+Renders a JSONL or CSV corpus of (id, text, voice) rows straight through
+TTSService, without the HTTP layer:
+
+    python -m src.bulk prompts.jsonl --output-dir renders/ --preset final
+
+Each row is written to <output-dir>/<id>.wav and recorded in a manifest
+(manifest.jsonl) in the output directory. Re-running the same command skips
+rows the manifest already lists as done, so an interrupted run resumes
+where it stopped.
+"""
+
+import argparse
+import csv
+import hashlib
+import json
+import os
+import re
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from itertools import islice
+
+import torchaudio as ta
+
+# Import configuration using relative imports
+from .config.config import Config
+from .services.audio_processing import audio_save_kwargs, resolve_audio_options
+from .services.cancellation import GenerationCancelled
+from .services.presets import resolve_preset
+from .services.tts_service import TTSService
+
+
+def read_rows(path):
+    """
+    Stream (id, text, voice) rows from a JSONL or CSV file.
+
+    Rows without an id (missing or null) are numbered by their position in
+    the file; any other id, such as 0, is kept as given.
+
+    Args:
+        path (str): Path to a .jsonl or .csv file
+
+    Yields:
+        dict: Row with 'id', 'text' and 'voice' keys
+
+    Raises:
+        ValueError: If a row has an empty id
+    """
+    with open(path, newline='', encoding='utf-8') as f:
+        if path.lower().endswith('.csv'):
+            records = csv.DictReader(f)
+        else:
+            records = (json.loads(line) for line in f if line.strip())
+
+        for index, record in enumerate(records, start=1):
+            row_id = record.get('id')
+            row_id = str(index if row_id is None else row_id)
+            if not row_id.strip():
+                raise ValueError(f"Row {index} of {path} has an empty id")
+            yield {
+                'id': row_id,
+                'text': record.get('text') or '',
+                'voice': record.get('voice') or None
+            }
+
+
+def safe_filename(row_id):
+    """
+    Make a row id safe to use as an output filename.
+
+    Ids that had to be changed get a short hash of the original id appended,
+    so distinct ids such as "a/b" and "a_b" never share a file.
+    """
+    name = re.sub(r'[^A-Za-z0-9._-]+', '_', row_id).strip('._') or 'item'
+    if name != row_id:
+        name = f"{name}-{hashlib.sha256(row_id.encode('utf-8')).hexdigest()[:8]}"
+    return name
+
+
+def check_unique_ids(path):
+    """
+    Make sure no row id appears twice in a corpus file.
+
+    Rows with the same id would write the same output file and manifest id.
+
+    Raises:
+        ValueError: Listing the duplicated ids
+    """
+    seen, duplicates = set(), []
+    for row in read_rows(path):
+        if row['id'] in seen and row['id'] not in duplicates:
+            duplicates.append(row['id'])
+        seen.add(row['id'])
+
+    if duplicates:
+        shown = ', '.join(duplicates[:10]) + (' ...' if len(duplicates) > 10 else '')
+        raise ValueError(f"Duplicate row ids in {path}: {shown}")
+
+
+def load_manifest(path):
+    """
+    Read the ids already completed by a previous run.
+
+    Returns:
+        set: Row ids whose manifest status is 'ok'
+    """
+    done = set()
+    if not os.path.exists(path):
+        return done
+
+    with open(path, encoding='utf-8') as f:
+        for line in f:
+            try:
+                entry = json.loads(line)
+            except ValueError:
+                continue  # Last line of an interrupted run may be partial
+            if entry.get('status') == 'ok':
+                done.add(entry['id'])
+    return done
+
+
+class BulkRun:
+    """
+    One bulk synthesis run over a corpus file.
+
+    Rows are read lazily in batches of batch_size; each batch is sorted by
+    voice so consecutive generations reuse the same conditionals, and is
+    spread over a pool of worker threads. Workers go through the service
+    scheduler at 'batch' priority, so a run can share a model with the web
+    app without starving interactive requests.
+    """
+
+    def __init__(self, tts_service, input_path, output_dir, workers=None, batch_size=None,
+                 preset=None, audio_options=None):
+        self.tts_service = tts_service
+        self.input_path = input_path
+        self.output_dir = output_dir
+        self.workers = workers or Config.BULK_WORKERS
+        self.batch_size = batch_size or Config.BULK_BATCH_SIZE
+        self.preset = preset
+        self.audio_options = audio_options
+        self.manifest_path = os.path.join(output_dir, Config.BULK_MANIFEST_NAME)
+
+        self._lock = threading.Lock()
+        self.counts = {'ok': 0, 'failed': 0, 'skipped': 0}
+        self.audio_seconds = 0.0
+
+    def run(self):
+        """
+        Synthesize every pending row of the corpus.
+
+        Row ids must be unique; check the corpus with check_unique_ids first.
+
+        Returns:
+            dict: Final counts of ok/failed/skipped rows
+        """
+        os.makedirs(self.output_dir, exist_ok=True)
+        done = load_manifest(self.manifest_path)
+        # Count only rows of this corpus; the manifest may list ids since removed from it
+        total = skipped = 0
+        for row in read_rows(self.input_path):
+            if row['id'] in done:
+                skipped += 1
+            else:
+                total += 1
+        self.counts['skipped'] = skipped
+        print(f"Bulk synthesis: {total} rows to render, {skipped} already done")
+
+        self.total = total
+        self.started = time.time()
+        rows = (row for row in read_rows(self.input_path) if row['id'] not in done)
+
+        with open(self.manifest_path, 'a', encoding='utf-8') as manifest, \
+                ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix='bulk') as pool:
+            self._manifest = manifest
+            while True:
+                batch = list(islice(rows, self.batch_size))
+                if not batch:
+                    break
+                batch.sort(key=lambda row: row['voice'] or '')
+                # Wait for the batch so read-ahead stays bounded by batch_size
+                list(pool.map(self._render_row, batch))
+
+        self._report(final=True)
+        return dict(self.counts)
+
+    def _render_row(self, row):
+        filename = f"{safe_filename(row['id'])}.wav"
+        entry = {'id': row['id'], 'file': filename}
+
+        try:
+            voice_file = self.tts_service.resolve_voice_file(row['voice'])
+            if voice_file and not os.path.exists(voice_file):
+                raise ValueError(f"Voice file not found: {row['voice']}")
+
+            wav, sample_rate, cached = self.tts_service.synthesize(
+                row['text'],
+                voice_file=voice_file,
+                preset=self.preset,
+                audio_options=self.audio_options,
+                priority='batch',
+                client_key=f'bulk:{self.input_path}'
+            )
+            ta.save(os.path.join(self.output_dir, filename), wav, sample_rate,
+                    **audio_save_kwargs(self.audio_options))
+
+            duration = wav.shape[-1] / sample_rate
+            entry.update(status='ok', duration=round(duration, 3), cached=cached)
+
+        except (ValueError, GenerationCancelled) as e:
+            entry.update(status='failed', error=str(e))
+        except Exception as e:
+            print(f"Error rendering {row['id']}: {e}")
+            entry.update(status='failed', error=f'Generation failed: {str(e)}')
+
+        with self._lock:
+            # One line per row, flushed so a kill loses at most the row in flight
+            self._manifest.write(json.dumps(entry) + '\n')
+            self._manifest.flush()
+            self.counts[entry['status']] += 1
+            if entry['status'] == 'ok':
+                self.audio_seconds += entry['duration']
+            self._report()
+
+    def _report(self, final=False):
+        finished = self.counts['ok'] + self.counts['failed']
+        elapsed = max(time.time() - self.started, 1e-6)
+        rate = finished / elapsed
+        eta = (self.total - finished) / rate if rate else 0.0
+        # Real-time factor over whole-run wall time (workers overlap)
+        rtf = elapsed / self.audio_seconds if self.audio_seconds else 0.0
+
+        status = (f"[{finished}/{self.total}] ok={self.counts['ok']} failed={self.counts['failed']} "
+                  f"{rate:.2f} rows/s, {self.audio_seconds:.1f}s audio, RTF {rtf:.2f}")
+        if final:
+            print(f"Bulk synthesis finished in {elapsed:.1f}s: {status}")
+        else:
+            print(f"{status}, ETA {eta:.0f}s")
+
+
+def main(argv=None):
+    """Command-line entry point for offline bulk synthesis."""
+    parser = argparse.ArgumentParser(
+        prog='python -m src.bulk',
+        description='Render a JSONL/CSV corpus of (id, text, voice) rows to audio files.'
+    )
+    parser.add_argument('input', help='Path to a .jsonl or .csv corpus file')
+    parser.add_argument('--output-dir', required=True, help='Directory for audio files and the manifest')
+    parser.add_argument('--workers', type=int, default=Config.BULK_WORKERS,
+                        help=f'Worker threads (default {Config.BULK_WORKERS})')
+    parser.add_argument('--batch-size', type=int, default=Config.BULK_BATCH_SIZE,
+                        help=f'Rows read ahead and grouped by voice (default {Config.BULK_BATCH_SIZE})')
+    parser.add_argument('--preset', default=None,
+                        help=f"Speed/quality preset ({', '.join(Config.GENERATION_PRESETS)})")
+    parser.add_argument('--audio-profile', default=None,
+                        help=f"Output audio profile ({', '.join(Config.AUDIO_PROFILES)})")
+    args = parser.parse_args(argv)
+
+    try:
+        # Validate options before loading the model
+        audio_options = resolve_audio_options(args.audio_profile)
+        resolve_preset(args.preset)
+        check_unique_ids(args.input)
+    except ValueError as e:
+        parser.error(str(e))
+
+    tts_service = TTSService(lazy_load=False)
+    try:
+        counts = BulkRun(tts_service, args.input, args.output_dir, workers=args.workers,
+                         batch_size=args.batch_size, preset=args.preset,
+                         audio_options=audio_options).run()
+    except KeyboardInterrupt:
+        print("\nInterrupted; re-run the same command to resume.")
+        return 130
+    finally:
+        tts_service.shutdown()
+
+    return 1 if counts['failed'] else 0
+
+
+if __name__ == '__main__':
+    raise SystemExit(main())
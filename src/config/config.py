@@ -1,3 +1,4 @@
+import os
 import torch
 
 class Config:
@@ -8,30 +9,129 @@ class Config:
     HOST = '0.0.0.0'
     PORT = 5000
     
+    # Serving settings ('development' uses Flask's built-in server)
+    SERVER_MODE = os.environ.get('SERVER_MODE', 'development')  # 'development' or 'production'
+    SERVER_MODEL_THREADS = 16  # Threads for requests waiting on the model scheduler
+    SERVER_IO_THREADS = 32  # Threads for file and metadata requests
+    SERVER_KEEP_ALIVE_TIMEOUT = 15  # Seconds idle keep-alive connections stay open
+    SERVER_GRACEFUL_TIMEOUT = 120  # Seconds to wait for in-flight synthesis on shutdown
+    SERVER_MAX_BODY_BYTES = 1024 * 1024  # Maximum request body for generation routes
+    
     # Model loading settings
     LAZY_LOAD_MODEL = False  # Set to True for faster startup, False for faster first request
     USE_RELOADER = False     # Set to True for development auto-reload, False to keep model in memory
+    MODEL_CHECKPOINT_DIR = os.environ.get('MODEL_CHECKPOINT_DIR')  # Local checkpoint; unset uses the pretrained model
+    MODEL_VERSION = os.environ.get('MODEL_VERSION')  # Cache key version; derived from the checkpoint if unset, set it on replicas sharing a cache
+    
+    # Model hot-swap settings (POST /admin/model/reload)
+    ADMIN_TOKEN = os.environ.get('ADMIN_TOKEN')  # Bearer token for /admin routes; unset disables them
+    MODEL_WARMUP_TEXT = 'Warming up the new model.'  # Generated before a reloaded model takes traffic
+    MODEL_SWAP_PRIORITY = 'batch'  # Scheduler class of the warm-up generation
+    MODEL_SWAP_DRAIN_TIMEOUT = 600  # Seconds to wait for generations on the old model before releasing it
     
     # TTS settings
     MAX_TEXT_LENGTH = 1000
     MAX_HISTORY_ITEMS = 20
     OUTPUT_DIR = 'outputs'
+    OUTPUT_SHARD_PREFIX_LEN = 2  # Hex chars of the filename hash used as subdirectory (256 shards)
+    OUTPUT_WRITER_QUEUE_SIZE = 64  # Pending writes before requests write inline
+    OUTPUT_WRITE_WAIT_TIMEOUT = 10  # Seconds file routes wait for a pending write
     
     # Audio settings
     AUDIO_FORMAT = 'wav'
     AUDIO_MIMETYPE = 'audio/wav'
+    AUDIO_CACHE_MAX_AGE = 365 * 24 * 3600  # Generated files never change; cache them for a year
+    WAVEFORM_PEAKS = 100  # Peak values per waveform preview (history and voice list)
+    WAVEFORM_SIDECAR_SUFFIX = '.waveform.json'  # Stored next to voice recordings
+    USE_X_SENDFILE = os.environ.get('USE_X_SENDFILE', '').lower() == 'true'  # Apache (mod_xsendfile) or lighttpd only, not nginx
+    
+    # Audio post-processing profiles; requests may also override single options
+    AUDIO_PROFILES = {
+        'web': {'sample_rate': 24000, 'bit_depth': 16},
+        'telephony': {'sample_rate': 8000, 'channels': 1, 'loudness': -20.0,
+                      'trim_silence': True, 'bit_depth': 8},
+    }
     
     # TTS generation parameters
     DEFAULT_CFG_WEIGHT = 0.3  # Lower CFG weight for faster generation
     DEFAULT_EXAGGERATION = 0.5  # Balanced exaggeration
     
+    # Speed/quality presets selectable per request. cfg_weight 0 disables CFG, which
+    # halves the T3 batch; max_new_tokens caps speech tokens; flow_steps sets the
+    # number of S3Gen flow-matching steps (model default: 10).
+    GENERATION_PRESETS = {
+        'draft': {
+            'cfg_weight': 0.0,
+            'exaggeration': DEFAULT_EXAGGERATION,
+            'min_p': 0.1,
+            'max_new_tokens': 600,
+            'flow_steps': 4,
+        },
+        'balanced': {
+            'cfg_weight': DEFAULT_CFG_WEIGHT,
+            'exaggeration': DEFAULT_EXAGGERATION,
+        },
+        'final': {
+            'cfg_weight': 0.5,
+            'exaggeration': DEFAULT_EXAGGERATION,
+            'min_p': 0.05,
+            'flow_steps': 10,
+        },
+    }
+    DEFAULT_PRESET = 'balanced'
+    
+    # Request scheduling settings
+    SCHEDULER_CLASS_WEIGHTS = {  # Relative share of model time per priority class
+        'interactive': 8,
+        'batch': 1,
+        'background': 0,  # Zero weight: only runs when no other class is waiting
+    }
+    SCHEDULER_DEFAULT_CLASS = 'interactive'  # Class used when a request has no priority
+    SCHEDULER_MAX_CONCURRENT = 1  # Concurrent generations allowed on the model
+    
+    # Request deadline settings
+    REQUEST_TIMEOUT = 120  # Default per-request deadline in seconds (queueing + synthesis)
+    MAX_REQUEST_TIMEOUT = 600  # Upper bound for deadlines requested by clients
+    DISCONNECT_POLL_INTERVAL = 0.25  # Seconds between client-disconnect checks
+    
     # Streaming TTS settings
     STREAMING_ENABLED = True
     STREAMING_CHUNK_SIZE = 200  # Maximum characters per chunk
     STREAMING_MIN_CHUNK_SIZE = 50  # Minimum characters per chunk
+    CHUNK_MAX_TOKENS = 150  # Maximum model text tokens per sentence piece once the tokenizer is loaded
+    CHUNK_PACK_WINDOW = 4  # Chunks' worth of text balanced together when packing
     STREAMING_MAX_CONCURRENT_CHUNKS = 3  # Maximum chunks to process concurrently
     STREAMING_PRELOAD_CHUNKS = 2  # Number of chunks to preload
-    STREAMING_TIMEOUT = 30  # Timeout for streaming sessions in seconds
+    STREAMING_TIMEOUT = 30  # Seconds a stream may wait for its first audio (whole streams use REQUEST_TIMEOUT)
+    STREAMING_FIRST_WINDOW_TOKENS = 10  # Speech tokens (25 per second) before the first audio is vocoded
+    STREAMING_WINDOW_TOKENS = 25  # New speech tokens per following vocoder window
+    STREAMING_CONTEXT_TOKENS = 8  # Already-played tokens re-vocoded as left context for each window
+    STREAMING_LOOKAHEAD_TOKENS = 3  # Trailing tokens held back until the next window (S3Gen lookahead)
+    
+    # Phrase cache settings (per-sentence audio reused across requests)
+    PHRASE_CACHE_ENABLED = True
+    PHRASE_CACHE_MAX_BYTES = 256 * 1024 * 1024  # Memory budget for cached sentence audio
+    
+    # Result cache settings (whole-request audio)
+    RESULT_CACHE_MAX_BYTES = 256 * 1024 * 1024  # Memory budget for cached request audio
+    WARMUP_MANIFEST = os.environ.get('WARMUP_MANIFEST')  # JSON/JSONL of {"text", "voice"} to pre-render
+    VOICE_CONDS_CACHE_ITEMS = 32  # Voices whose conditioning tensors are kept in memory
+    
+    # Shared cache settings (audio and voice conditionals reused across replicas)
+    SHARED_CACHE_BACKEND = os.environ.get('SHARED_CACHE_BACKEND', 'none')  # 'none', 'local' or 'redis'
+    SHARED_CACHE_DIR = os.environ.get('SHARED_CACHE_DIR', os.path.join(OUTPUT_DIR, 'shared_cache'))
+    SHARED_CACHE_URL = os.environ.get('SHARED_CACHE_URL', 'redis://localhost:6379/0')
+    SHARED_CACHE_KEY_PREFIX = 'tts:'  # Prefix of every Redis key written by the app
+    SHARED_CACHE_TTL = 7 * 24 * 3600  # Seconds a shared entry stays valid
+    SHARED_CACHE_MAX_BYTES = 4 * 1024 * 1024 * 1024  # Size budget of the local cache directory
+    SHARED_CACHE_MAX_ENTRY_BYTES = 32 * 1024 * 1024  # Larger entries stay in memory only
+    SHARED_CACHE_TIMEOUT = 0.5  # Seconds before a Redis call counts as failed
+    SHARED_CACHE_RETRY_SECONDS = 30  # Seconds on the local fallback after a Redis failure
+    
+    # Offline bulk synthesis settings (python -m src.bulk)
+    BULK_WORKERS = 2  # Threads feeding the model scheduler
+    BULK_BATCH_SIZE = 16  # Rows read ahead and grouped by voice per batch
+    BULK_MANIFEST_NAME = 'manifest.jsonl'  # Per-run results log used for resuming
     
     # Audio streaming settings
     AUDIO_CHUNK_BUFFER_SIZE = 1024 * 16  # Buffer size for audio streaming
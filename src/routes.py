@@ -1,8 +1,43 @@
-from flask import Blueprint, render_template, request, jsonify, send_file, url_for
+from flask import Blueprint, Response, render_template, request, jsonify, send_file, url_for
 
 # Import configuration and utilities using relative imports
 from .config.config import Config
-from .utils import validate_filename, handle_error
+from .utils import (validate_filename, handle_error, get_disconnect_checker, parse_request_timeout,
+                    get_waveform_sidecar_path, is_admin_authorized)
+from .services.cancellation import CancellationToken
+from .services.audio_processing import resolve_audio_options, wav_stream_header, pcm16_bytes
+
+
+def send_immutable_audio(filepath, filename, as_attachment=False):
+    """
+    Send a generated audio file with validators for client and CDN caching.
+    
+    Generated files are never rewritten (each generation gets a new UUID),
+    so the filename is a strong ETag and responses are cacheable forever.
+    send_file handles If-None-Match (304) and Range requests (206) for seeking.
+    The body is streamed in chunks through wsgi.file_wrapper, or left to an
+    Apache/lighttpd front server when USE_X_SENDFILE is set.
+    
+    Args:
+        filepath (str): Path of the audio file
+        filename (str): Public filename, used as ETag and download name
+        as_attachment (bool): Whether to send as a download
+        
+    Returns:
+        Response: Flask response
+    """
+    response = send_file(
+        filepath,
+        mimetype=Config.AUDIO_MIMETYPE,
+        as_attachment=as_attachment,
+        download_name=filename,
+        conditional=True,
+        etag=filename.rsplit('.', 1)[0],
+        max_age=Config.AUDIO_CACHE_MAX_AGE
+    )
+    response.cache_control.public = True
+    response.cache_control.immutable = True
+    return response
 
 
 def create_routes(tts_service):
@@ -18,7 +53,10 @@ def create_routes(tts_service):
             device_info = tts_service.get_device_info()
             return render_template('index.html', 
                                  audio_history=audio_history,
-                                 device_info=device_info)
+                                 device_info=device_info,
+                                 presets=tts_service.get_presets(),
+                                 streaming_enabled=Config.STREAMING_ENABLED,
+                                 stream_timeout=Config.MAX_REQUEST_TIMEOUT)
         except Exception as e:
             return handle_error(f"Error loading page: {str(e)}", 500)
     
@@ -61,10 +99,15 @@ def create_routes(tts_service):
             # Save the file
             audio_file.save(filepath)
             
+            # Store duration and peaks so the voice list needs no audio download
+            waveform = tts_service.store_voice_waveform(filepath) or {}
+            
             return jsonify({
                 'success': True,
                 'filename': filename,
                 'filepath': filepath,
+                'duration': waveform.get('duration'),
+                'peaks': waveform.get('peaks'),
                 'message': 'Voice recording saved successfully for cloning'
             })
             
@@ -126,8 +169,11 @@ def create_routes(tts_service):
             if not os.path.exists(filepath):
                 return jsonify({'error': 'Voice recording file not found'}), 404
             
-            # Delete the file
+            # Delete the file and its waveform summary
             os.remove(filepath)
+            sidecar = get_waveform_sidecar_path(filepath)
+            if os.path.exists(sidecar):
+                os.remove(sidecar)
             
             return jsonify({
                 'success': True,
@@ -163,9 +209,14 @@ def create_routes(tts_service):
             # Save the file
             audio_file.save(filepath)
             
+            # Store duration and peaks so the voice list needs no audio download
+            waveform = tts_service.store_voice_waveform(filepath) or {}
+            
             return jsonify({
                 'success': True,
                 'filename': filename,
+                'duration': waveform.get('duration'),
+                'peaks': waveform.get('peaks'),
                 'message': 'Voice recording uploaded successfully'
             })
             
@@ -183,8 +234,39 @@ def create_routes(tts_service):
             text = data.get('text', '').strip()
             voice_file = data.get('voice_file', None)  # Optional voice file for cloning
             
+            # Priority class and client key for fair scheduling
+            priority = data.get('priority') or request.headers.get('X-Priority')
+            client_key = (data.get('client_id') or request.headers.get('X-Client-Key')
+                          or request.remote_addr)
+            
+            # Optional post-processing: named profile and/or individual overrides
+            try:
+                audio_options = resolve_audio_options(
+                    data.get('audio_profile'),
+                    {name: data.get(name) for name in
+                     ('sample_rate', 'channels', 'loudness', 'trim_silence', 'bit_depth')}
+                )
+            except ValueError as e:
+                return jsonify({'error': str(e)}), 400
+            
+            # Per-request deadline; generation also stops if the client goes away
+            cancel_token = CancellationToken(
+                timeout=parse_request_timeout(data.get('timeout')),
+                is_disconnected=get_disconnect_checker(request.environ)
+            )
+            
             # Generate audio using TTS service
-            result = tts_service.generate_audio(text, voice_file)
+            result = tts_service.generate_audio(text, voice_file,
+                                                priority=priority,
+                                                client_key=client_key,
+                                                cancel_token=cancel_token,
+                                                audio_options=audio_options,
+                                                preset=data.get('preset'))
+            
+            if result.get('cancelled'):
+                # 504 for deadlines; 499 (client closed request) otherwise
+                status_code = 504 if result['reason'] == CancellationToken.DEADLINE else 499
+                return jsonify(result), status_code
             
             if 'error' in result:
                 return jsonify(result), 400
@@ -199,6 +281,67 @@ def create_routes(tts_service):
             print(error_msg)
             return jsonify({'error': error_msg}), 500
     
+    @routes.route('/generate-stream', methods=['GET', 'POST'])
+    def generate_tts_stream():
+        """Stream TTS audio while it is generated, for low time-to-first-audio."""
+        try:
+            if not Config.STREAMING_ENABLED:
+                return jsonify({'error': 'Streaming is disabled'}), 404
+            
+            # GET lets an <audio> element play the stream directly
+            data = request.get_json(silent=True) if request.method == 'POST' else request.args
+            if not data:
+                return jsonify({'error': 'No request data provided'}), 400
+            
+            priority = data.get('priority') or request.headers.get('X-Priority')
+            client_key = (data.get('client_id') or request.headers.get('X-Client-Key')
+                          or request.remote_addr)
+            
+            # Closing the connection stops the stream at the next decoding step
+            cancel_token = CancellationToken(
+                timeout=parse_request_timeout(data.get('timeout')),
+                is_disconnected=get_disconnect_checker(request.environ)
+            )
+            
+            try:
+                chunks = tts_service.stream_audio(data.get('text', '').strip(),
+                                                  data.get('voice_file'),
+                                                  priority=priority,
+                                                  client_key=client_key,
+                                                  cancel_token=cancel_token,
+                                                  preset=data.get('preset'))
+            except ValueError as e:
+                return jsonify({'error': str(e)}), 400
+            
+            def stream():
+                try:
+                    header_sent = False
+                    for sample_rate, chunk in chunks:
+                        if not header_sent:
+                            yield wav_stream_header(sample_rate)
+                            header_sent = True
+                        yield pcm16_bytes(chunk)
+                finally:
+                    chunks.close()
+            
+            return Response(stream(), mimetype=Config.AUDIO_MIMETYPE, headers={
+                'Cache-Control': 'no-store',
+                'X-Accel-Buffering': 'no'  # Don't let nginx buffer the stream
+            })
+            
+        except Exception as e:
+            error_msg = f'Unexpected error during streaming: {str(e)}'
+            print(error_msg)
+            return jsonify({'error': error_msg}), 500
+    
+    @routes.route('/presets')
+    def list_presets():
+        """List speed/quality presets with their measured real-time factor."""
+        try:
+            return jsonify({'presets': tts_service.get_presets()})
+        except Exception as e:
+            return handle_error(f"Error listing presets: {str(e)}", 500)
+    
     @routes.route('/audio/<filename>')
     def serve_audio(filename):
         """Serve audio file for playback."""
@@ -211,11 +354,33 @@ def create_routes(tts_service):
                 return "Audio file not found", 404
             
             filepath = tts_service.get_audio_filepath(filename)
-            return send_file(filepath, mimetype=Config.AUDIO_MIMETYPE)
+            return send_immutable_audio(filepath, filename)
             
         except Exception as e:
             return handle_error(f"Error serving audio: {str(e)}", 500)
     
+    @routes.route('/waveform/<filename>')
+    def serve_waveform(filename):
+        """Get the duration and downsampled peaks of a generated audio file."""
+        try:
+            # Validate filename for security
+            if not validate_filename(filename):
+                return jsonify({'error': 'Invalid filename'}), 400
+            
+            waveform = tts_service.get_waveform(filename)
+            if waveform is None:
+                return jsonify({'error': 'Audio file not found'}), 404
+            
+            # Generated files never change, so neither does their waveform
+            response = jsonify(waveform)
+            response.cache_control.public = True
+            response.cache_control.max_age = Config.AUDIO_CACHE_MAX_AGE
+            response.cache_control.immutable = True
+            return response
+            
+        except Exception as e:
+            return handle_error(f"Error getting waveform: {str(e)}", 500)
+    
     @routes.route('/download/<filename>')
     def download_audio(filename):
         """Download audio file."""
@@ -228,7 +393,7 @@ def create_routes(tts_service):
                 return "Audio file not found", 404
             
             filepath = tts_service.get_audio_filepath(filename)
-            return send_file(filepath, as_attachment=True, download_name=filename)
+            return send_immutable_audio(filepath, filename, as_attachment=True)
             
         except Exception as e:
             return handle_error(f"Error downloading audio: {str(e)}", 500)
@@ -245,11 +410,52 @@ def create_routes(tts_service):
                 'device_info': device_info,
                 'history_count': history_count,
                 'max_text_length': Config.MAX_TEXT_LENGTH,
-                'max_history_items': Config.MAX_HISTORY_ITEMS
+                'max_history_items': Config.MAX_HISTORY_ITEMS,
+                'scheduler': tts_service.scheduler.get_stats(),
+                'metrics': tts_service.get_metrics(),
+                'single_flight': tts_service.single_flight.get_stats(),
+                'phrase_cache': tts_service.phrase_cache.get_stats(),
+                'result_cache': tts_service.result_cache.get_stats(),
+                'voice_conds_cache': tts_service.conds_cache.get_stats(),
+                'warmup': tts_service.warmup_status,
+                'presets': tts_service.get_presets(),
+                'streaming': tts_service.get_stream_stats(),
+                'output_writer': tts_service.output_writer.get_stats()
             })
         except Exception as e:
             return handle_error(f"Error getting status: {str(e)}", 500)
     
+    @routes.route('/admin/model')
+    def model_status():
+        """Get the serving model version and the progress of the latest reload."""
+        if not is_admin_authorized(request.headers.get('Authorization')):
+            return jsonify({'error': 'Unauthorized'}), 401
+        
+        return jsonify(tts_service.get_model_status())
+    
+    @routes.route('/admin/model/reload', methods=['POST'])
+    def reload_model():
+        """Load a model in the background and hot-swap it in without downtime."""
+        try:
+            if not is_admin_authorized(request.headers.get('Authorization')):
+                return jsonify({'error': 'Unauthorized'}), 401
+            
+            data = request.get_json(silent=True) or {}
+            checkpoint_dir = data.get('checkpoint_dir')
+            
+            import os
+            if checkpoint_dir and not os.path.isdir(checkpoint_dir):
+                return jsonify({'error': 'Checkpoint directory not found'}), 400
+            
+            if not tts_service.reload_model(checkpoint_dir, data.get('version')):
+                return jsonify({'error': 'A model reload is already running'}), 409
+            
+            # Accepted; poll /admin/model for progress
+            return jsonify({'success': True, **tts_service.get_model_status()}), 202
+            
+        except Exception as e:
+            return handle_error(f"Error reloading model: {str(e)}", 500)
+    
     @routes.route('/health')
     def health():
         """Health check endpoint."""
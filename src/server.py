@@ -0,0 +1,141 @@
+"""
+Production serving mode.
+
+Runs the Flask app behind uvicorn through an ASGI front end. The event loop
+only moves bytes; WSGI handlers run in two separate thread pools so that
+requests waiting for the model can never starve file and metadata requests.
+"""
+
+import asyncio
+import threading
+
+try:
+    import uvicorn
+    from a2wsgi import WSGIMiddleware
+except ImportError:  # Optional dependencies; app.py falls back to the Flask server
+    uvicorn = None
+    WSGIMiddleware = None
+
+# Import configuration using relative imports
+from .config.config import Config
+
+
+# Routes that wait on the model scheduler; everything else is file/metadata I/O
+MODEL_ROUTE_PREFIXES = ('/generate',)
+
+# ASGI scope key holding a threading.Event set when the client disconnects
+DISCONNECT_SCOPE_KEY = 'tts.disconnected'
+
+
+class ServingFrontend:
+    """
+    ASGI application dispatching to the Flask app.
+
+    Model routes and I/O routes get their own WSGI thread pools. For model
+    routes the request body is read up front so the connection can be
+    watched for an early disconnect while synthesis runs; the resulting
+    event is exposed to the WSGI side through the ASGI scope.
+    """
+
+    def __init__(self, app, tts_service):
+        self.tts_service = tts_service
+        self.model_app = WSGIMiddleware(app, workers=Config.SERVER_MODEL_THREADS)
+        self.io_app = WSGIMiddleware(app, workers=Config.SERVER_IO_THREADS)
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] == 'lifespan':
+            await self._lifespan(receive, send)
+        elif scope['type'] == 'http' and scope['path'].startswith(MODEL_ROUTE_PREFIXES):
+            await self._model_request(scope, receive, send)
+        else:
+            await self.io_app(scope, receive, send)  # a2wsgi closes websockets
+
+    async def _model_request(self, scope, receive, send):
+        # Read the (small JSON) body before handing over to the WSGI thread
+        body = bytearray()
+        more_body = True
+        while more_body:
+            message = await receive()
+            if message['type'] == 'http.disconnect':
+                return
+            body.extend(message.get('body', b''))
+            more_body = message.get('more_body', False)
+            if len(body) > Config.SERVER_MAX_BODY_BYTES:
+                await self._send_error(send, 413, b'Request body too large')
+                return
+
+        disconnected = threading.Event()
+        disconnected_async = asyncio.Event()
+
+        async def watch_disconnect():
+            while True:
+                message = await receive()
+                if message['type'] == 'http.disconnect':
+                    disconnected.set()
+                    disconnected_async.set()
+                    return
+
+        delivered = False
+
+        async def replay_receive():
+            nonlocal delivered
+            if not delivered:
+                delivered = True
+                return {'type': 'http.request', 'body': bytes(body), 'more_body': False}
+            await disconnected_async.wait()
+            return {'type': 'http.disconnect'}
+
+        watcher = asyncio.ensure_future(watch_disconnect())
+        try:
+            await self.model_app(dict(scope, **{DISCONNECT_SCOPE_KEY: disconnected}),
+                                 replay_receive, send)
+        finally:
+            watcher.cancel()
+
+    async def _lifespan(self, receive, send):
+        while True:
+            message = await receive()
+            if message['type'] == 'lifespan.startup':
+                await send({'type': 'lifespan.startup.complete'})
+            elif message['type'] == 'lifespan.shutdown':
+                # uvicorn has stopped accepting and drained open requests; now let
+                # background synthesis and pending file writes finish
+                loop = asyncio.get_running_loop()
+                await loop.run_in_executor(None, self.tts_service.shutdown,
+                                           Config.SERVER_GRACEFUL_TIMEOUT)
+                await send({'type': 'lifespan.shutdown.complete'})
+                return
+
+    @staticmethod
+    async def _send_error(send, status, body):
+        await send({'type': 'http.response.start', 'status': status,
+                    'headers': [(b'content-type', b'text/plain')]})
+        await send({'type': 'http.response.body', 'body': body})
+
+
+def production_server_available():
+    """Check whether the optional production serving dependencies are installed."""
+    return uvicorn is not None and WSGIMiddleware is not None
+
+
+def run_production_server(app, tts_service):
+    """
+    Serve the app with uvicorn until shutdown.
+
+    On SIGTERM/SIGINT uvicorn stops accepting connections and waits up to
+    SERVER_GRACEFUL_TIMEOUT seconds for in-flight requests, after which the
+    TTS service finishes queued synthesis and file writes.
+
+    Args:
+        app (Flask): Flask application instance
+        tts_service (TTSService): TTS service instance
+    """
+    uvicorn.run(
+        ServingFrontend(app, tts_service),
+        host=Config.HOST,
+        port=Config.PORT,
+        lifespan='on',
+        timeout_keep_alive=Config.SERVER_KEEP_ALIVE_TIMEOUT,
+        timeout_graceful_shutdown=Config.SERVER_GRACEFUL_TIMEOUT,
+        log_level='info'
+    )
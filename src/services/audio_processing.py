@@ -0,0 +1,249 @@
+import struct
+
+import numpy as np
+import soxr
+import torch
+
+# Import configuration using relative imports
+from ..config.config import Config
+
+
+# Output bit depth -> torchaudio save arguments. 8-bit uses mu-law, the telephony standard.
+BIT_DEPTH_ENCODINGS = {
+    32: {'encoding': 'PCM_F', 'bits_per_sample': 32},
+    16: {'encoding': 'PCM_S', 'bits_per_sample': 16},
+    8: {'encoding': 'ULAW', 'bits_per_sample': 8},
+}
+
+
+def crossfade_concat(segments, sample_rate, overlap_ms):
+    """
+    Join waveform segments with short linear crossfades.
+
+    Args:
+        segments (list[torch.Tensor]): Waveforms shaped (channels, samples)
+        sample_rate (int): Sample rate of the segments
+        overlap_ms (int): Crossfade length in milliseconds
+
+    Returns:
+        torch.Tensor: Stitched waveform shaped (channels, samples)
+    """
+    if not segments:
+        raise ValueError("No audio segments to join")
+    if len(segments) == 1:
+        return segments[0]
+
+    overlap = int(sample_rate * overlap_ms / 1000)
+    # Never fade over more than half of the shortest segment
+    overlap = min([overlap] + [seg.shape[-1] // 2 for seg in segments])
+    if overlap <= 0:
+        return torch.cat(segments, dim=-1)
+
+    fade_in = torch.linspace(0.0, 1.0, overlap, dtype=segments[0].dtype)
+    fade_out = 1.0 - fade_in
+
+    pieces = [segments[0][..., :-overlap]]
+    tail = segments[0][..., -overlap:]
+    for seg in segments[1:]:
+        pieces.append(tail * fade_out + seg[..., :overlap] * fade_in)
+        pieces.append(seg[..., overlap:-overlap])
+        tail = seg[..., -overlap:]
+    pieces.append(tail)
+    return torch.cat(pieces, dim=-1)
+
+
+def resolve_audio_options(profile=None, overrides=None):
+    """
+    Build normalized post-processing options from a named profile and overrides.
+
+    Args:
+        profile (str, optional): Name of an entry in Config.AUDIO_PROFILES
+        overrides (dict, optional): Explicit sample_rate, channels, loudness,
+            trim_silence and bit_depth values taking precedence over the profile
+
+    Returns:
+        dict or None: Normalized options, or None for the model's native output
+
+    Raises:
+        ValueError: If the profile or an option value is invalid
+    """
+    if profile and profile not in Config.AUDIO_PROFILES:
+        raise ValueError(f"Unknown audio profile '{profile}'. "
+                         f"Available: {', '.join(sorted(Config.AUDIO_PROFILES))}")
+
+    options = dict(Config.AUDIO_PROFILES.get(profile) or {})
+    options.update({k: v for k, v in (overrides or {}).items() if v is not None})
+    if not options:
+        return None
+
+    try:
+        resolved = {
+            'sample_rate': int(options['sample_rate']) if options.get('sample_rate') else None,
+            'channels': int(options['channels']) if options.get('channels') else None,
+            'loudness': float(options['loudness']) if options.get('loudness') is not None else None,
+            'trim_silence': bool(options.get('trim_silence', False)),
+            'bit_depth': int(options.get('bit_depth', 32)),
+        }
+    except (TypeError, ValueError):
+        raise ValueError("Invalid audio option value")
+
+    if resolved['sample_rate'] is not None and not 8000 <= resolved['sample_rate'] <= 48000:
+        raise ValueError("sample_rate must be between 8000 and 48000")
+    if resolved['channels'] not in (None, 1):
+        raise ValueError("channels must be 1 (mono)")
+    if resolved['loudness'] is not None and not -60.0 <= resolved['loudness'] <= 0.0:
+        raise ValueError("loudness must be between -60 and 0 dBFS")
+    if resolved['bit_depth'] not in BIT_DEPTH_ENCODINGS:
+        raise ValueError(f"bit_depth must be one of {sorted(BIT_DEPTH_ENCODINGS)}")
+    return resolved
+
+
+def trim_silence(audio, sample_rate, threshold_db=-50.0, frame_ms=10, pad_ms=50):
+    """
+    Trim leading and trailing silence using framewise RMS energy.
+
+    Args:
+        audio (np.ndarray): Samples shaped (samples, channels)
+        sample_rate (int): Sample rate
+        threshold_db (float): Frames quieter than this (dBFS) count as silence
+        frame_ms (int): Analysis frame length
+        pad_ms (int): Silence kept around the detected speech
+
+    Returns:
+        np.ndarray: Trimmed samples
+    """
+    frame = max(1, int(sample_rate * frame_ms / 1000))
+    n_frames = audio.shape[0] // frame
+    if n_frames == 0:
+        return audio
+
+    frames = audio[:n_frames * frame].reshape(n_frames, frame, -1)
+    rms = np.sqrt(np.mean(np.square(frames), axis=(1, 2)))
+    loud = np.flatnonzero(rms > 10 ** (threshold_db / 20))
+    if loud.size == 0:
+        return audio[:0]
+
+    pad = int(sample_rate * pad_ms / 1000)
+    start = max(0, loud[0] * frame - pad)
+    end = min(audio.shape[0], (loud[-1] + 1) * frame + pad)
+    return audio[start:end]
+
+
+def normalize_loudness(audio, target_dbfs, peak_dbfs=-1.0):
+    """
+    Scale audio to a target RMS level, limited so peaks stay below peak_dbfs.
+
+    Args:
+        audio (np.ndarray): Samples shaped (samples, channels)
+        target_dbfs (float): Target RMS level in dBFS
+        peak_dbfs (float): Maximum allowed sample peak in dBFS
+
+    Returns:
+        np.ndarray: Scaled samples
+    """
+    rms = np.sqrt(np.mean(np.square(audio)))
+    peak = np.max(np.abs(audio))
+    if rms == 0 or peak == 0:
+        return audio
+
+    gain = 10 ** (target_dbfs / 20) / rms
+    gain = min(gain, 10 ** (peak_dbfs / 20) / peak)
+    return audio * np.float32(gain)
+
+
+def postprocess_audio(wav, sample_rate, options):
+    """
+    Apply the post-processing stage to a generated waveform.
+
+    Runs, in order: downmix, silence trimming, resampling (soxr) and
+    loudness normalization. Bit-depth reduction happens when the file is
+    written, using audio_save_kwargs(options).
+
+    Args:
+        wav (torch.Tensor): Waveform shaped (channels, samples)
+        sample_rate (int): Sample rate of wav
+        options (dict): Options from resolve_audio_options
+
+    Returns:
+        tuple: (processed waveform tensor, output sample rate)
+    """
+    # (samples, channels) layout is what soxr expects
+    audio = wav.detach().cpu().numpy().astype(np.float32, copy=False).T
+
+    if options['channels'] == 1 and audio.shape[1] > 1:
+        audio = audio.mean(axis=1, keepdims=True)
+
+    if options['trim_silence']:
+        audio = trim_silence(audio, sample_rate)
+
+    target_rate = options['sample_rate'] or sample_rate
+    if target_rate != sample_rate and audio.shape[0] > 0:
+        audio = soxr.resample(audio, sample_rate, target_rate, quality='HQ')
+        if audio.ndim == 1:
+            audio = audio[:, None]
+
+    if options['loudness'] is not None and audio.shape[0] > 0:
+        audio = normalize_loudness(audio, options['loudness'])
+
+    return torch.from_numpy(np.ascontiguousarray(audio.T, dtype=np.float32)), target_rate
+
+
+def audio_save_kwargs(options):
+    """Get torchaudio save arguments for the requested output bit depth."""
+    if not options:
+        return {}
+    return dict(BIT_DEPTH_ENCODINGS[options['bit_depth']])
+
+
+def compute_peaks(wav, bins=None):
+    """
+    Downsample a waveform to a compact peak envelope for drawing previews.
+
+    Args:
+        wav (torch.Tensor or np.ndarray): Waveform shaped (channels, samples) or (samples,)
+        bins (int, optional): Number of peaks; defaults to Config.WAVEFORM_PEAKS
+
+    Returns:
+        list[float]: Peak absolute amplitude (0..1) of each bin
+    """
+    audio = wav.detach().cpu().numpy() if isinstance(wav, torch.Tensor) else np.asarray(wav)
+    audio = np.abs(audio.astype(np.float32, copy=False))
+    if audio.ndim > 1:
+        audio = audio.max(axis=0)
+    if audio.size == 0:
+        return []
+
+    bins = min(bins or Config.WAVEFORM_PEAKS, audio.size)
+    starts = np.linspace(0, audio.size, bins + 1).astype(np.int64)[:-1]
+    peaks = np.minimum(np.maximum.reduceat(audio, starts), 1.0)
+    return [round(float(peak), 3) for peak in peaks]
+
+
+def waveform_summary(wav, sample_rate):
+    """
+    Get the duration and peak envelope of a waveform.
+
+    Returns:
+        dict: {'duration': seconds, 'peaks': list of floats}
+    """
+    return {'duration': round(wav.shape[-1] / sample_rate, 3), 'peaks': compute_peaks(wav)}
+
+
+def wav_stream_header(sample_rate, channels=1):
+    """
+    Build a 16-bit PCM WAV header for a stream of unknown length.
+
+    The RIFF and data sizes are set to the maximum value, which browsers
+    and common decoders treat as "read until the connection closes".
+    """
+    block_align = channels * 2
+    return (b'RIFF' + struct.pack('<I', 0xFFFFFFFF) + b'WAVE'
+            + b'fmt ' + struct.pack('<IHHIIHH', 16, 1, channels, sample_rate,
+                                    sample_rate * block_align, block_align, 16)
+            + b'data' + struct.pack('<I', 0xFFFFFFFF))
+
+
+def pcm16_bytes(chunk):
+    """Convert a 1-D float waveform chunk to little-endian 16-bit PCM bytes."""
+    audio = chunk.detach().cpu().numpy() if isinstance(chunk, torch.Tensor) else np.asarray(chunk)
+    return (np.clip(audio, -1.0, 1.0) * 32767.0).astype('<i2').tobytes()
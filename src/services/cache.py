@@ -0,0 +1,83 @@
+import threading
+from collections import OrderedDict
+
+
+def tensor_nbytes(value):
+    """Approximate memory footprint of a cached tensor (or tuple starting with one)."""
+    if isinstance(value, tuple):
+        value = value[0]
+    return value.element_size() * value.nelement()
+
+
+class LRUCache:
+    """
+    Thread-safe least-recently-used cache bounded by total size in bytes.
+
+    Args:
+        max_bytes (int): Size budget; least recently used entries are evicted beyond it
+        sizeof (callable): Returns the size in bytes of a cached value
+    """
+
+    def __init__(self, max_bytes, sizeof=tensor_nbytes):
+        self.max_bytes = max_bytes
+        self._sizeof = sizeof
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()  # key -> (value, size)
+        self._bytes = 0
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key):
+        """Get a cached value (or None) and mark it as recently used."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[0]
+
+    def put(self, key, value):
+        """Store a value, evicting least recently used entries to stay within budget."""
+        size = self._sizeof(value)
+        if size > self.max_bytes:
+            return
+
+        with self._lock:
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self._bytes -= old[1]
+            self._entries[key] = (value, size)
+            self._bytes += size
+
+            while self._bytes > self.max_bytes:
+                _, (_, evicted_size) = self._entries.popitem(last=False)
+                self._bytes -= evicted_size
+
+    def clear(self):
+        """Remove every entry."""
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def __contains__(self, key):
+        with self._lock:
+            return key in self._entries
+
+    def __len__(self):
+        with self._lock:
+            return len(self._entries)
+
+    def get_stats(self):
+        """Get entry count, memory use and hit rate."""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'entries': len(self._entries),
+                'bytes': self._bytes,
+                'max_bytes': self.max_bytes,
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': round(self.hits / lookups, 3) if lookups else 0.0
+            }
@@ -0,0 +1,95 @@
+import time
+
+# Import configuration using relative imports
+from ..config.config import Config
+
+
+class GenerationCancelled(Exception):
+    """Raised inside a generation when its request no longer needs the result."""
+
+    def __init__(self, reason):
+        super().__init__(f"Generation cancelled ({reason})")
+        self.reason = reason
+
+
+class CancellationToken:
+    """
+    Tracks whether a generation should keep running.
+
+    A token is cancelled when its deadline passes, when the client
+    disconnect check reports the connection is gone, or when cancel() is
+    called explicitly. Long-running code calls check() at safe points
+    (between chunks, between decoding steps) to abort early.
+    """
+
+    DEADLINE = 'deadline_exceeded'
+    DISCONNECTED = 'client_disconnected'
+    CANCELLED = 'cancelled'
+
+    def __init__(self, timeout=None, is_disconnected=None):
+        self.deadline = time.time() + timeout if timeout else None
+        self.reason = None
+        self._is_disconnected = is_disconnected
+        self._last_poll = 0.0
+
+    def cancel(self, reason=CANCELLED):
+        """Cancel the token explicitly."""
+        if self.reason is None:
+            self.reason = reason
+
+    @property
+    def cancelled(self):
+        """Whether the work guarded by this token should stop."""
+        if self.reason is not None:
+            return True
+
+        now = time.time()
+        if self.deadline is not None and now >= self.deadline:
+            self.cancel(self.DEADLINE)
+        elif self._is_disconnected and now - self._last_poll >= Config.DISCONNECT_POLL_INTERVAL:
+            # Socket polling is cheap but not free; rate-limit it
+            self._last_poll = now
+            if self._is_disconnected():
+                self.cancel(self.DISCONNECTED)
+
+        return self.reason is not None
+
+    def check(self):
+        """Raise GenerationCancelled if the token has been cancelled."""
+        if self.cancelled:
+            raise GenerationCancelled(self.reason)
+
+
+class SharedCancellationToken(CancellationToken):
+    """
+    Cancellation token for work shared by several requests.
+
+    The shared work is cancelled only once every attached request token has
+    been cancelled, so it keeps running until the latest of their deadlines.
+    Each request still checks its own token for the result it returns.
+    """
+
+    def __init__(self, token):
+        super().__init__()
+        self._members = [token]
+
+    def attach(self, token):
+        """
+        Attach another request to the shared work.
+
+        Returns:
+            bool: False if the shared work was already cancelled
+        """
+        if self.cancelled:
+            return False
+        self._members.append(token)
+        return True
+
+    @property
+    def cancelled(self):
+        """Whether every attached request has been cancelled."""
+        if self.reason is None:
+            members = list(self._members)
+            if all(token.cancelled for token in members):
+                self.cancel(members[-1].reason)
+        return self.reason is not None
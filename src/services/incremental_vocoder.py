@@ -0,0 +1,182 @@
+import inspect
+from contextlib import contextmanager
+
+import numpy as np
+import torch
+
+# Import configuration using relative imports
+from ..config.config import Config
+
+
+# S3 speech tokenizer vocabulary size; larger ids are T3 start/stop tokens
+SPEECH_VOCAB_SIZE = 6561
+
+# S3 speech tokens per second of audio
+SPEECH_TOKEN_RATE = 25
+
+
+class IncrementalVocoder:
+    """
+    Vocodes speech tokens in small windows while T3 is still generating.
+
+    Every token T3 samples is embedded through t3.speech_emb before the next
+    step, so a forward hook there sees the token stream as it is produced.
+    Once enough new tokens are pending, they are run through S3Gen together
+    with a few already-played tokens of left context, and the audio for the
+    new tokens is emitted. The last STREAMING_LOOKAHEAD_TOKENS are held back
+    because S3Gen's lookahead makes their audio depend on tokens not yet
+    generated. Consecutive windows are joined with a short crossfade.
+
+    When T3 finishes, ChatterboxTTS.generate calls s3gen.inference on the
+    full token sequence; that call is redirected to vocode only the
+    remaining tail, which generate then watermarks as usual. Earlier
+    windows are watermarked here before they are emitted.
+    """
+
+    def __init__(self, model, emit):
+        self.model = model
+        self.emit = emit
+        self.sample_rate = model.sr
+        self.samples_per_token = model.sr // SPEECH_TOKEN_RATE
+        self.overlap = int(model.sr * Config.AUDIO_OVERLAP_MS / 1000)
+        self.tokens = []
+        self.emitted = 0  # Tokens whose audio has been emitted
+        self.held = None  # Emitted-window tail kept back for the crossfade
+        self.chunks = []
+        self._vocode = model.s3gen.inference
+        self._accepts_finalize = 'finalize' in inspect.signature(self._vocode).parameters
+
+    def on_token(self, module, args, output):
+        """Forward hook on t3.speech_emb collecting sampled speech tokens."""
+        tokens = args[0]
+        if tokens.numel() != 1:
+            return  # Conditioning prompt, not a sampled token
+
+        token = int(tokens.item())
+        if token >= SPEECH_VOCAB_SIZE:
+            return  # Start-of-speech token
+
+        self.tokens.append(token)
+        window = Config.STREAMING_FIRST_WINDOW_TOKENS if not self.emitted else Config.STREAMING_WINDOW_TOKENS
+        if len(self.tokens) - self.emitted >= window + Config.STREAMING_LOOKAHEAD_TOKENS:
+            end = len(self.tokens) - Config.STREAMING_LOOKAHEAD_TOKENS
+            segment = self._vocode_window(self.tokens, end, final=False)
+            if segment is not None:
+                self._push(self._watermark(segment), final=False)
+
+    def vocode_tail(self, speech_tokens, ref_dict=None, **kwargs):
+        """Stand-in for s3gen.inference vocoding only the tokens not yet emitted."""
+        tokens = speech_tokens.view(-1).tolist()
+        self.emitted = min(self.emitted, len(tokens))
+        segment = self._vocode_window(tokens, len(tokens), final=True, ref_dict=ref_dict)
+        if segment is None:
+            segment = torch.zeros(0)
+        return segment.unsqueeze(0), None
+
+    def finish(self, wav):
+        """
+        Emit the watermarked tail returned by ChatterboxTTS.generate.
+
+        Returns:
+            torch.Tensor: Complete waveform of the sentence, shaped (1, samples)
+        """
+        self._push(wav.view(-1).float(), final=True)
+        if not self.chunks:
+            return torch.zeros(1, 0)
+        return torch.cat(self.chunks).unsqueeze(0)
+
+    def _vocode_window(self, tokens, end, final, ref_dict=None):
+        """
+        Vocode tokens[emitted:end] with left context and any later tokens as lookahead.
+
+        Returns:
+            torch.Tensor or None: The new audio, starting early by the held crossfade length
+        """
+        if end <= self.emitted:
+            return None
+
+        start = max(0, self.emitted - Config.STREAMING_CONTEXT_TOKENS)
+        kwargs = {
+            'speech_tokens': torch.tensor(tokens[start:], dtype=torch.long, device=self.model.device),
+            'ref_dict': ref_dict if ref_dict is not None else self.model.conds.gen
+        }
+        if self._accepts_finalize:
+            kwargs['finalize'] = final
+
+        wav, _ = self._vocode(**kwargs)
+        wav = wav.view(-1).detach().cpu().float()
+
+        # Start early enough to crossfade with the held tail of the previous window
+        begin = (self.emitted - start) * self.samples_per_token
+        if self.held is not None:
+            begin = max(0, begin - len(self.held))
+        stop = len(wav) if final else min(len(wav), (end - start) * self.samples_per_token)
+
+        self.emitted = end
+        return wav[begin:stop] if stop > begin else None
+
+    def _push(self, segment, final):
+        """Crossfade a segment onto the held tail and emit everything that is settled."""
+        if self.held is not None:
+            n = min(len(self.held), len(segment))
+            fade = torch.linspace(0.0, 1.0, n)
+            head = self.held[:n] * (1.0 - fade) + segment[:n] * fade
+            segment = torch.cat([head, segment[n:]])
+            self.held = None
+
+        if not final and len(segment) > self.overlap:
+            self.held = segment[-self.overlap:]
+            segment = segment[:-self.overlap]
+
+        if len(segment):
+            self.chunks.append(segment)
+            self.emit(segment)
+
+    def _watermark(self, segment):
+        """Apply the model's watermark to an intermediate window."""
+        watermarker = getattr(self.model, 'watermarker', None)
+        if watermarker is None:
+            return segment
+        watermarked = watermarker.apply_watermark(segment.numpy(), sample_rate=self.sample_rate)
+        return torch.from_numpy(np.asarray(watermarked, dtype=np.float32))
+
+
+def incremental_vocoding_supported(model):
+    """Check whether the loaded model exposes the hooks incremental vocoding needs."""
+    t3 = getattr(model, 't3', None)
+    s3gen = getattr(model, 's3gen', None)
+    return (isinstance(getattr(t3, 'speech_emb', None), torch.nn.Module)
+            and callable(getattr(s3gen, 'inference', None))
+            and hasattr(model, 'conds'))
+
+
+@contextmanager
+def incremental_vocoding(model, emit):
+    """
+    Stream audio out of ChatterboxTTS.generate while it runs.
+
+    Inside the block, model.generate calls emit(chunk) with float waveform
+    chunks as soon as they are vocoded. Pass the waveform generate returns
+    to vocoder.finish() to emit the final tail. Like decoding_overrides,
+    this patches the model instance and is only safe while a single
+    generation runs on the model at a time.
+
+    Args:
+        model: Loaded ChatterboxTTS model
+        emit (callable): Called with each 1-D waveform chunk
+
+    Yields:
+        IncrementalVocoder: The vocoder collecting this generation's audio
+    """
+    if not incremental_vocoding_supported(model):
+        raise RuntimeError('Incremental vocoding is not supported by the installed chatterbox version')
+
+    vocoder = IncrementalVocoder(model, emit)
+    handle = model.t3.speech_emb.register_forward_hook(vocoder.on_token)
+    model.s3gen.inference = vocoder.vocode_tail
+    try:
+        yield vocoder
+    finally:
+        handle.remove()
+        # The instance attribute shadows the class method; deleting restores it
+        del model.s3gen.inference
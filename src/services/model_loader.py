@@ -0,0 +1,129 @@
+import hashlib
+import os
+import time
+from importlib import metadata
+
+import torch
+from chatterbox.tts import ChatterboxTTS
+
+
+# Error raised by MPS for convolutions it cannot run; the model must run on CPU instead
+MPS_CHANNEL_LIMIT_ERROR = "Output channels > 65536 not supported"
+
+# Bytes hashed from each end of a checkpoint file when deriving its version
+VERSION_SAMPLE_BYTES = 1024 * 1024
+
+
+class LoadedModel:
+    """
+    A model instance together with its version and in-flight usage.
+
+    Generations pin the LoadedModel they started on, so a hot swap never
+    changes the model under a running request. active counts those pins;
+    once a swapped-out model's count reaches zero its weights can be freed.
+
+    Args:
+        model (ChatterboxTTS): Loaded model
+        version (str): Version label included in cache keys
+        device (str): Device the model runs on
+    """
+
+    def __init__(self, model, version, device):
+        self.model = model
+        self.version = version
+        self.device = device
+        # Built-in voice, restored for requests without a voice file
+        self.default_conds = getattr(model, 'conds', None)
+        self.loaded_at = time.time()
+        self.active = 0
+
+    def describe(self):
+        """Get the version, device and load time for status reports."""
+        return {
+            'version': self.version,
+            'device': self.device,
+            'loaded_at': time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(self.loaded_at)),
+            'active_generations': self.active
+        }
+
+
+def model_version_for(checkpoint_dir=None, version=None):
+    """
+    Get the version label of a model checkpoint.
+
+    Local checkpoints are identified by the names and sizes of their files
+    and the bytes at the start and end of each one. Identical copies of a
+    checkpoint therefore get the same version on every replica, while
+    retrained weights get a new one. The pretrained download is identified
+    by the chatterbox-tts release.
+
+    Args:
+        checkpoint_dir (str, optional): Local checkpoint directory
+        version (str, optional): Explicit label, returned unchanged
+
+    Returns:
+        str: Version label
+    """
+    if version:
+        return version
+
+    if checkpoint_dir:
+        digest = hashlib.sha256()
+        for root, _, files in sorted(os.walk(checkpoint_dir)):
+            for name in sorted(files):
+                path = os.path.join(root, name)
+                size = os.path.getsize(path)
+                digest.update(f"{os.path.relpath(path, checkpoint_dir)}:{size}\n".encode('utf-8'))
+                with open(path, 'rb') as f:
+                    digest.update(f.read(VERSION_SAMPLE_BYTES))
+                    if size > 2 * VERSION_SAMPLE_BYTES:
+                        f.seek(-VERSION_SAMPLE_BYTES, os.SEEK_END)
+                        digest.update(f.read())
+        return f"local-{digest.hexdigest()[:12]}"
+
+    try:
+        return f"pretrained-{metadata.version('chatterbox-tts')}"
+    except metadata.PackageNotFoundError:
+        return 'pretrained'
+
+
+def load_model(device, checkpoint_dir=None):
+    """
+    Load a ChatterboxTTS model, falling back to CPU on MPS limitations.
+
+    Args:
+        device (str): Preferred device
+        checkpoint_dir (str, optional): Local checkpoint directory; defaults
+            to the pretrained model
+
+    Returns:
+        tuple: (model, device it was loaded on)
+    """
+    def load(target):
+        if checkpoint_dir:
+            return ChatterboxTTS.from_local(checkpoint_dir, device=target)
+        return ChatterboxTTS.from_pretrained(device=target)
+
+    try:
+        model = load(device)
+        print(f"Model loaded successfully on {device}")
+        return model, device
+    except Exception as e:
+        if device == "mps" and MPS_CHANNEL_LIMIT_ERROR in str(e):
+            print(f"MPS device limitation detected. Falling back to CPU...")
+            torch.set_grad_enabled(False)  # Re-disable gradients for CPU
+            model = load("cpu")
+            print(f"Model loaded successfully on CPU (MPS fallback)")
+            return model, "cpu"
+        raise e
+
+
+def release_model(loaded):
+    """Drop a swapped-out model's weights and return cached device memory."""
+    loaded.model = None
+    loaded.default_conds = None
+    if torch.cuda.is_available():
+        torch.cuda.empty_cache()
+    if torch.backends.mps.is_available():
+        torch.mps.empty_cache()
+
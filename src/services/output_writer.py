@@ -0,0 +1,106 @@
+import os
+import queue
+import threading
+
+import torchaudio as ta
+
+# Import configuration using relative imports
+from ..config.config import Config
+
+
+class OutputWriter:
+    """
+    Background thread that persists and evicts audio files.
+
+    Requests hand finished waveforms to the writer and return immediately;
+    file writes and removals happen off the request thread. The queue is
+    bounded: when it is full the caller writes inline instead, so memory
+    held by pending waveforms cannot grow without limit.
+    """
+
+    _STOP = object()
+
+    def __init__(self, max_queue=None):
+        self._queue = queue.Queue(maxsize=max_queue or Config.OUTPUT_WRITER_QUEUE_SIZE)
+        self._lock = threading.Lock()
+        self._pending = {}  # filepath -> Event set once the file is written
+        self._thread = threading.Thread(target=self._run, name='output-writer', daemon=True)
+        self._thread.start()
+
+    def save(self, filepath, wav, sample_rate, **save_kwargs):
+        """Queue a waveform to be saved to filepath (save_kwargs go to torchaudio.save)."""
+        with self._lock:
+            self._pending[filepath] = threading.Event()
+        self._submit(self._save, filepath, wav, sample_rate, save_kwargs)
+
+    def remove(self, filepath):
+        """Queue a file for removal."""
+        self._submit(self._remove, filepath)
+
+    def submit(self, fn, *args):
+        """Run an arbitrary housekeeping callable on the writer thread."""
+        self._submit(fn, *args)
+
+    def wait_for(self, filepath, timeout=None):
+        """
+        Wait until a queued file has been written.
+
+        Returns:
+            bool: True if the file is not pending (anymore)
+        """
+        with self._lock:
+            event = self._pending.get(filepath)
+        return event is None or event.wait(timeout)
+
+    def flush(self):
+        """Block until every queued job has run."""
+        self._queue.join()
+
+    def close(self):
+        """Drain the queue and stop the writer thread."""
+        if self._thread.is_alive():
+            self._queue.put((self._STOP, ()))
+            self._thread.join()
+
+    def get_stats(self):
+        """Get queue depth and pending write count."""
+        with self._lock:
+            pending = len(self._pending)
+        return {'queued': self._queue.qsize(), 'pending_writes': pending}
+
+    def _submit(self, fn, *args):
+        try:
+            self._queue.put_nowait((fn, args))
+        except queue.Full:
+            # Backpressure: do the work on the caller's thread
+            fn(*args)
+
+    def _run(self):
+        while True:
+            fn, args = self._queue.get()
+            try:
+                if fn is self._STOP:
+                    return
+                fn(*args)
+            except Exception as e:
+                print(f"Warning: Output writer job failed: {e}")
+            finally:
+                self._queue.task_done()
+
+    def _save(self, filepath, wav, sample_rate, save_kwargs):
+        try:
+            os.makedirs(os.path.dirname(filepath), exist_ok=True)
+            ta.save(filepath, wav, sample_rate, **save_kwargs)
+        finally:
+            with self._lock:
+                event = self._pending.pop(filepath, None)
+            if event is not None:
+                event.set()
+
+    def _remove(self, filepath):
+        try:
+            os.remove(filepath)
+        except FileNotFoundError:
+            pass
+        except OSError as e:
+            print(f"Warning: Could not remove old audio file {filepath}: {e}")
@@ -0,0 +1,92 @@
+import inspect
+from contextlib import contextmanager
+
+# Import configuration using relative imports
+from ..config.config import Config
+
+
+# Preset keys that are not arguments of ChatterboxTTS.generate
+DECODING_OVERRIDES = ('max_new_tokens', 'flow_steps')
+
+
+def resolve_preset(name=None):
+    """
+    Get the generation parameters of a named speed/quality preset.
+
+    Args:
+        name (str, optional): Preset name; defaults to Config.DEFAULT_PRESET
+
+    Returns:
+        dict: Generation parameters, including the preset name under 'preset'
+
+    Raises:
+        ValueError: If the preset does not exist
+    """
+    name = name or Config.DEFAULT_PRESET
+    if name not in Config.GENERATION_PRESETS:
+        raise ValueError(f"Unknown preset '{name}'. "
+                         f"Available: {', '.join(Config.GENERATION_PRESETS)}")
+    return dict(Config.GENERATION_PRESETS[name], preset=name)
+
+
+def split_generation_params(model, params):
+    """
+    Split preset parameters into model.generate kwargs and decoding overrides.
+
+    Arguments the installed ChatterboxTTS.generate does not accept are
+    dropped, so presets keep working across chatterbox versions.
+
+    Returns:
+        tuple: (generate kwargs, decoding override kwargs)
+    """
+    accepted = inspect.signature(model.generate).parameters
+    accepts_any = any(p.kind == inspect.Parameter.VAR_KEYWORD for p in accepted.values())
+    generate_kwargs = {k: v for k, v in params.items()
+                       if (accepts_any or k in accepted) and k not in DECODING_OVERRIDES + ('preset',)}
+    overrides = {k: params[k] for k in DECODING_OVERRIDES if params.get(k) is not None}
+    return generate_kwargs, overrides
+
+
+@contextmanager
+def decoding_overrides(model, max_new_tokens=None, flow_steps=None):
+    """
+    Temporarily cap T3 speech tokens and S3Gen flow-matching steps.
+
+    ChatterboxTTS.generate hardcodes both, so the calls are wrapped on the
+    model instance for the duration of the block. Only safe while a single
+    generation runs on the model at a time (SCHEDULER_MAX_CONCURRENT = 1).
+
+    Args:
+        model: Loaded ChatterboxTTS model
+        max_new_tokens (int, optional): Maximum speech tokens T3 may generate
+        flow_steps (int, optional): Number of ODE steps in the S3Gen decoder
+    """
+    patched = []
+
+    def wrap(owner, attr, override):
+        original = getattr(owner, attr, None)
+        if original is None:
+            print(f"Warning: cannot apply preset override for {attr}; not found on model")
+            return
+
+        def wrapper(*args, **kwargs):
+            kwargs.update(override(kwargs))
+            return original(*args, **kwargs)
+
+        setattr(owner, attr, wrapper)
+        patched.append((owner, attr))
+
+    if max_new_tokens:
+        wrap(getattr(model, 't3', None), 'inference', lambda kwargs: {
+            'max_new_tokens': min(kwargs.get('max_new_tokens') or max_new_tokens, max_new_tokens)
+        })
+    if flow_steps:
+        decoder = getattr(getattr(getattr(model, 's3gen', None), 'flow', None), 'decoder', None)
+        wrap(decoder, 'forward', lambda kwargs: {'n_timesteps': flow_steps})
+
+    try:
+        yield
+    finally:
+        # Instance attributes shadow the class methods; deleting restores them
+        for owner, attr in patched:
+            delattr(owner, attr)
@@ -0,0 +1,214 @@
+import threading
+import time
+from collections import OrderedDict, deque
+from contextlib import contextmanager
+
+# Import configuration using relative imports
+from ..config.config import Config
+from .cancellation import GenerationCancelled
+
+
+class SchedulerTicket:
+    """A unit of work waiting for (or holding) a model slot."""
+
+    def __init__(self, priority, client_key):
+        self.priority = priority
+        self.client_key = client_key
+        self.enqueued_at = time.time()
+        self.started_at = None
+        self._dispatched = threading.Event()
+
+    @property
+    def wait_time(self):
+        """Seconds spent in the queue before dispatch (so far, if still queued)."""
+        end = self.started_at if self.started_at is not None else time.time()
+        return end - self.enqueued_at
+
+
+class FairScheduler:
+    """
+    Weighted-fair scheduler in front of the TTS model.
+
+    Requests are grouped into priority classes (e.g. 'interactive' and
+    'batch'). Backlogged classes share model slots in proportion to their
+    weight using start-time fair queuing, so a flood of batch work cannot
+    starve interactive users. Within a class, clients are served round-robin
+    so one noisy client key cannot monopolize its class either.
+    """
+
+    def __init__(self, class_weights=None, default_class=None, max_concurrent=None):
+        self.class_weights = dict(class_weights or Config.SCHEDULER_CLASS_WEIGHTS)
+        self.default_class = default_class or Config.SCHEDULER_DEFAULT_CLASS
+        self.max_concurrent = max_concurrent or Config.SCHEDULER_MAX_CONCURRENT
+
+        self._lock = threading.Lock()
+        self._idle = threading.Condition(self._lock)
+        self._running = 0
+        self._virtual_time = 0.0
+
+        # Per class: client_key -> deque of tickets, kept in round-robin order
+        self._queues = {name: OrderedDict() for name in self.class_weights}
+        self._finish_tags = {name: 0.0 for name in self.class_weights}
+        self._stats = {
+            name: {'running': 0, 'dispatched': 0, 'total_wait': 0.0, 'max_wait': 0.0}
+            for name in self.class_weights
+        }
+
+    def normalize_priority(self, priority):
+        """Map a requested priority to a known class, falling back to the default."""
+        if priority in self.class_weights:
+            return priority
+        return self.default_class
+
+    def acquire(self, priority=None, client_key=None, cancel_token=None):
+        """
+        Block until a model slot is granted.
+
+        Args:
+            priority (str, optional): Priority class name
+            client_key (str, optional): Key identifying the calling client
+            cancel_token (CancellationToken, optional): Stops waiting once cancelled,
+                e.g. when the request's deadline passes
+
+        Returns:
+            SchedulerTicket: Ticket that must be passed to release()
+
+        Raises:
+            GenerationCancelled: If the cancel token fired while queued
+        """
+        ticket = SchedulerTicket(self.normalize_priority(priority), client_key or 'anonymous')
+
+        with self._lock:
+            clients = self._queues[ticket.priority]
+            clients.setdefault(ticket.client_key, deque()).append(ticket)
+            self._dispatch_locked()
+
+        while True:
+            # Wake up periodically so cancelled requests leave the queue promptly
+            wait = Config.DISCONNECT_POLL_INTERVAL if cancel_token is not None else None
+            if ticket._dispatched.wait(wait):
+                return ticket
+
+            if not cancel_token.cancelled:
+                continue
+
+            with self._lock:
+                # The ticket may have been dispatched while we were giving up
+                if ticket._dispatched.is_set():
+                    return ticket
+                self._remove_locked(ticket)
+            raise GenerationCancelled(cancel_token.reason)
+
+    def release(self, ticket):
+        """Return a model slot and dispatch the next waiting request."""
+        with self._lock:
+            self._running -= 1
+            self._stats[ticket.priority]['running'] -= 1
+            self._dispatch_locked()
+            if self._running == 0:
+                self._idle.notify_all()
+
+    def wait_idle(self, timeout=None):
+        """
+        Wait until no work is running or queued.
+
+        Returns:
+            bool: True if the scheduler became idle within the timeout
+        """
+        with self._idle:
+            return self._idle.wait_for(
+                lambda: self._running == 0 and not any(self._queues.values()), timeout)
+
+    @contextmanager
+    def slot(self, priority=None, client_key=None, cancel_token=None):
+        """Context manager holding a model slot for the duration of the block."""
+        ticket = self.acquire(priority, client_key, cancel_token)
+        try:
+            yield ticket
+        finally:
+            self.release(ticket)
+
+    def _remove_locked(self, ticket):
+        """Remove a queued ticket (caller holds the lock)."""
+        clients = self._queues[ticket.priority]
+        queue = clients.get(ticket.client_key)
+        if queue is None:
+            return
+        try:
+            queue.remove(ticket)
+        except ValueError:
+            return
+        if not queue:
+            del clients[ticket.client_key]
+
+    def _pick_class_locked(self):
+        """Pick the backlogged class with the smallest virtual finish tag."""
+        best_class = None
+        best_finish = None
+        for name, weight in self.class_weights.items():
+            if not self._queues[name] or weight <= 0:
+                continue
+            start = max(self._finish_tags[name], self._virtual_time)
+            finish = start + 1.0 / weight
+            if best_finish is None or finish < best_finish:
+                best_class, best_finish = name, finish
+
+        if best_class is not None:
+            self._virtual_time = best_finish - 1.0 / self.class_weights[best_class]
+            self._finish_tags[best_class] = best_finish
+            return best_class
+
+        # Zero-weight classes only run when nothing else is waiting
+        for name in self.class_weights:
+            if self._queues[name]:
+                return name
+        return None
+
+    def _dispatch_locked(self):
+        """Grant free slots to waiting tickets (caller holds the lock)."""
+        while self._running < self.max_concurrent:
+            name = self._pick_class_locked()
+            if name is None:
+                return
+
+            clients = self._queues[name]
+            client_key, queue = next(iter(clients.items()))
+            ticket = queue.popleft()
+            if queue:
+                clients.move_to_end(client_key)  # Round-robin between clients
+            else:
+                del clients[client_key]
+
+            ticket.started_at = time.time()
+            stats = self._stats[name]
+            stats['running'] += 1
+            stats['dispatched'] += 1
+            stats['total_wait'] += ticket.wait_time
+            stats['max_wait'] = max(stats['max_wait'], ticket.wait_time)
+            self._running += 1
+            ticket._dispatched.set()
+
+    def get_stats(self):
+        """Get per-class queue depth and wait time statistics."""
+        now = time.time()
+        with self._lock:
+            classes = {}
+            for name, weight in self.class_weights.items():
+                stats = self._stats[name]
+                queued = [t for q in self._queues[name].values() for t in q]
+                dispatched = stats['dispatched']
+                classes[name] = {
+                    'weight': weight,
+                    'queue_depth': len(queued),
+                    'waiting_clients': len(self._queues[name]),
+                    'running': stats['running'],
+                    'dispatched': dispatched,
+                    'avg_wait': round(stats['total_wait'] / dispatched, 3) if dispatched else 0.0,
+                    'max_wait': round(stats['max_wait'], 3),
+                    'oldest_wait': round(max((now - t.enqueued_at for t in queued), default=0.0), 3)
+                }
+            return {
+                'max_concurrent': self.max_concurrent,
+                'running': self._running,
+                'classes': classes
+            }
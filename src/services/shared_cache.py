@@ -0,0 +1,392 @@
+import hashlib
+import io
+import json
+import os
+import struct
+import threading
+import time
+import uuid
+
+import numpy as np
+import torch
+
+try:
+    import redis
+except ImportError:  # Optional dependency; the Redis backend is unavailable without it
+    redis = None
+
+# Import configuration using relative imports
+from ..config.config import Config
+
+
+# Header of serialized audio: magic, format version, sample rate (0 for bare waveforms)
+AUDIO_HEADER = struct.Struct('<4sBI')
+AUDIO_MAGIC = b'TTSA'
+AUDIO_FORMAT_VERSION = 1
+
+# Fraction of the size budget kept after a local eviction pass
+EVICTION_TARGET = 0.9
+
+
+def encode_audio(value):
+    """
+    Serialize a waveform, or a (waveform, sample rate) tuple, to bytes.
+
+    Uses the .npy format without pickling, so data read from a shared
+    backend can never execute code.
+    """
+    wav, sample_rate = value if isinstance(value, tuple) else (value, 0)
+    buffer = io.BytesIO()
+    buffer.write(AUDIO_HEADER.pack(AUDIO_MAGIC, AUDIO_FORMAT_VERSION, sample_rate))
+    np.save(buffer, wav.detach().cpu().numpy(), allow_pickle=False)
+    return buffer.getvalue()
+
+
+def decode_audio(data):
+    """
+    Deserialize audio written by encode_audio.
+
+    Returns:
+        torch.Tensor or tuple: The waveform, or (waveform, sample rate) if one was stored
+
+    Raises:
+        ValueError: If the data is not serialized audio of this format version
+    """
+    magic, version, sample_rate = AUDIO_HEADER.unpack_from(data)
+    if magic != AUDIO_MAGIC or version != AUDIO_FORMAT_VERSION:
+        raise ValueError('Not a cached audio entry of this format version')
+    wav = torch.from_numpy(np.load(io.BytesIO(data[AUDIO_HEADER.size:]), allow_pickle=False))
+    return (wav, sample_rate) if sample_rate else wav
+
+
+class LocalCacheBackend:
+    """
+    Cache entries stored as files in a directory.
+
+    Pointing every replica at the same directory on a shared volume lets
+    them reuse each other's audio. Entries expire ttl seconds after they were
+    written (file mtime); when the directory grows past max_bytes the least
+    recently read entries (file atime, set explicitly on every hit) are
+    removed. Writes go through a temporary file and an atomic rename, so
+    readers never see a partial entry.
+
+    Args:
+        directory (str): Cache directory
+        max_bytes (int): Size budget of the directory
+        ttl (float): Seconds an entry stays valid; 0 disables expiry
+    """
+
+    name = 'local'
+
+    def __init__(self, directory, max_bytes, ttl):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        os.makedirs(directory, exist_ok=True)
+        # Approximate: other replicas write to the same directory
+        self._bytes = sum(size for _, size, _, _ in self._iter_entries())
+
+    def get(self, key):
+        """Read an entry's bytes, or None if it is missing or expired."""
+        path = self._path(key)
+        try:
+            stat = os.stat(path)
+            if self._expired(stat.st_mtime, time.time()):
+                os.remove(path)
+                return None
+            with open(path, 'rb') as f:
+                data = f.read()
+            # Record the read for LRU eviction without extending the TTL
+            os.utime(path, (time.time(), stat.st_mtime))
+            return data
+        except FileNotFoundError:
+            return None  # Missing, or removed by another replica meanwhile
+
+    def set(self, key, data):
+        """Write an entry, evicting old entries if the directory is over budget."""
+        path = self._path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        temp_path = f"{path}.{uuid.uuid4().hex}.tmp"
+        with open(temp_path, 'wb') as f:
+            f.write(data)
+        os.replace(temp_path, path)
+
+        with self._lock:
+            self._bytes += len(data)
+            over_budget = self._bytes > self.max_bytes
+        if over_budget:
+            self.evict()
+
+    def evict(self):
+        """Remove expired entries, then least recently read ones until under budget."""
+        with self._lock:
+            now = time.time()
+            entries = []
+            total = 0
+            for path, size, read_at, written_at in self._iter_entries():
+                if self._expired(written_at, now) or (path.endswith('.tmp') and now - written_at > 3600):
+                    self._remove(path)  # Expired, or left behind by a crashed writer
+                    continue
+                entries.append((read_at, path, size))
+                total += size
+
+            entries.sort()
+            for _, path, size in entries:
+                if total <= self.max_bytes * EVICTION_TARGET:
+                    break
+                self._remove(path)
+                total -= size
+            self._bytes = total
+
+    def get_stats(self):
+        """Get the approximate size of the cache directory."""
+        with self._lock:
+            return {'backend': self.name, 'bytes': self._bytes, 'max_bytes': self.max_bytes}
+
+    def _path(self, key):
+        digest = hashlib.sha256(key.encode('utf-8')).hexdigest()
+        return os.path.join(self.directory, digest[:2], digest)
+
+    def _expired(self, written_at, now):
+        return bool(self.ttl) and now - written_at > self.ttl
+
+    def _iter_entries(self):
+        """Yield (path, size, atime, mtime) of every file in the cache directory."""
+        for shard in os.scandir(self.directory):
+            if not shard.is_dir():
+                continue
+            for entry in os.scandir(shard.path):
+                try:
+                    stat = entry.stat()
+                except FileNotFoundError:
+                    continue
+                yield entry.path, stat.st_size, stat.st_atime, stat.st_mtime
+
+    @staticmethod
+    def _remove(path):
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+
+
+class RedisCacheBackend:
+    """
+    Cache entries stored in Redis.
+
+    Only GET and SET with an expiry are used, so any client object with
+    redis-py's get(name) and set(name, value, ex=...) methods can stand in.
+    Entries expire after ttl seconds; the total size is bounded by the
+    server's maxmemory setting (use an LRU eviction policy such as
+    allkeys-lru).
+
+    Args:
+        client: Redis client
+        ttl (float): Seconds an entry stays valid; 0 disables expiry
+        prefix (str): Prefix of every key written by this application
+    """
+
+    name = 'redis'
+
+    def __init__(self, client, ttl, prefix=None):
+        self.client = client
+        self.ttl = ttl
+        self.prefix = prefix if prefix is not None else Config.SHARED_CACHE_KEY_PREFIX
+
+    @classmethod
+    def from_url(cls, url, ttl):
+        """
+        Create a backend for a redis:// URL.
+
+        Raises:
+            RuntimeError: If the redis package is not installed
+        """
+        if redis is None:
+            raise RuntimeError('the redis package is not installed')
+        client = redis.Redis.from_url(url, socket_timeout=Config.SHARED_CACHE_TIMEOUT,
+                                      socket_connect_timeout=Config.SHARED_CACHE_TIMEOUT)
+        return cls(client, ttl)
+
+    def get(self, key):
+        """Read an entry's bytes, or None if it is missing or expired."""
+        return self.client.get(self.prefix + key)
+
+    def set(self, key, data):
+        """Write an entry with the configured expiry."""
+        self.client.set(self.prefix + key, data, ex=int(self.ttl) or None)
+
+    def get_stats(self):
+        """Get the backend name."""
+        return {'backend': self.name}
+
+
+class FallbackCacheBackend:
+    """
+    Shared backend that switches to a local one while it is unreachable.
+
+    Any error from the shared backend marks it down for retry_after seconds;
+    meanwhile reads and writes go to the local backend, so an outage of the
+    shared cache only costs hit rate, never requests.
+
+    Args:
+        shared: Primary backend (e.g. RedisCacheBackend)
+        local: Backend used while the primary is down (e.g. LocalCacheBackend)
+        retry_after (float): Seconds before the shared backend is tried again
+    """
+
+    def __init__(self, shared, local, retry_after):
+        self.shared = shared
+        self.local = local
+        self.retry_after = retry_after
+        self.name = f'{shared.name}+{local.name}'
+        self._down_until = 0.0
+        self.failures = 0
+
+    def get(self, key):
+        return self._call('get', key)
+
+    def set(self, key, data):
+        return self._call('set', key, data)
+
+    def get_stats(self):
+        """Get the state of both backends and the number of shared backend failures."""
+        return {
+            'backend': self.name,
+            'shared_available': time.time() >= self._down_until,
+            'shared_failures': self.failures,
+            'local': self.local.get_stats()
+        }
+
+    def _call(self, method, *args):
+        if time.time() >= self._down_until:
+            try:
+                return getattr(self.shared, method)(*args)
+            except Exception as e:
+                self.failures += 1
+                self._down_until = time.time() + self.retry_after
+                print(f"Warning: Shared cache unavailable ({e}); "
+                      f"using local cache for {self.retry_after}s")
+        return getattr(self.local, method)(*args)
+
+
+def create_cache_backend():
+    """
+    Create the shared cache backend selected by Config.SHARED_CACHE_BACKEND.
+
+    Returns:
+        Backend instance, or None when no shared cache is configured
+
+    Raises:
+        ValueError: If the configured backend is unknown
+    """
+    kind = (Config.SHARED_CACHE_BACKEND or 'none').lower()
+    if kind == 'none':
+        return None
+
+    local = LocalCacheBackend(Config.SHARED_CACHE_DIR, Config.SHARED_CACHE_MAX_BYTES,
+                              Config.SHARED_CACHE_TTL)
+    if kind == 'local':
+        return local
+
+    if kind == 'redis':
+        try:
+            shared = RedisCacheBackend.from_url(Config.SHARED_CACHE_URL, Config.SHARED_CACHE_TTL)
+        except Exception as e:
+            print(f"Warning: Redis cache unavailable ({e}); using local cache only")
+            return local
+        return FallbackCacheBackend(shared, local, Config.SHARED_CACHE_RETRY_SECONDS)
+
+    raise ValueError(f"Unknown shared cache backend '{kind}'. Available: none, local, redis")
+
+
+class TieredCache:
+    """
+    In-memory LRU cache in front of a shared cache backend.
+
+    Lookups that miss memory are read from the backend and kept in memory.
+    New entries go to memory immediately; serializing and writing them to
+    the backend is handed to submit (the output writer thread), so requests
+    never wait on the network or the shared volume. Backend errors and
+    undecodable entries count as misses.
+
+    Args:
+        local (LRUCache): In-memory cache
+        backend: Shared backend, or None for a memory-only cache
+        namespace (str): Prefix separating this cache's keys in the backend
+        encode (callable): Serializes a value to bytes
+        decode (callable): Deserializes bytes to a value
+        submit (callable, optional): Runs fn(*args) in the background; defaults to inline
+    """
+
+    def __init__(self, local, backend, namespace, encode=encode_audio, decode=decode_audio, submit=None):
+        self.local = local
+        self.backend = backend
+        self.namespace = namespace
+        self._encode = encode
+        self._decode = decode
+        self._submit = submit or (lambda fn, *args: fn(*args))
+        self.shared_hits = 0
+        self.shared_misses = 0
+
+    def get(self, key):
+        """Get a cached value (or None), reading through to the shared backend."""
+        value = self.local.get(key)
+        if value is not None or self.backend is None:
+            return value
+
+        try:
+            data = self.backend.get(self._backend_key(key))
+            value = self._decode(data) if data is not None else None
+        except Exception as e:
+            print(f"Warning: Could not read {self.namespace} cache entry: {e}")
+            value = None
+
+        if value is None:
+            self.shared_misses += 1
+            return None
+        self.shared_hits += 1
+        self.local.put(key, value)
+        return value
+
+    def put(self, key, value):
+        """Store a value in memory and, in the background, in the shared backend."""
+        self.local.put(key, value)
+        if self.backend is not None:
+            self._submit(self._write, self._backend_key(key), value)
+
+    def clear(self):
+        """Drop the in-memory entries; the shared backend is left untouched."""
+        self.local.clear()
+
+    def __contains__(self, key):
+        return key in self.local or self.get(key) is not None
+
+    def __len__(self):
+        return len(self.local)
+
+    def get_stats(self):
+        """Get in-memory cache stats plus shared backend hits and state."""
+        stats = self.local.get_stats()
+        if self.backend is not None:
+            lookups = self.shared_hits + self.shared_misses
+            stats['shared'] = dict(
+                self.backend.get_stats(),
+                hits=self.shared_hits,
+                misses=self.shared_misses,
+                hit_rate=round(self.shared_hits / lookups, 3) if lookups else 0.0
+            )
+        return stats
+
+    def _backend_key(self, key):
+        if not isinstance(key, str):
+            key = hashlib.sha256(json.dumps(key).encode('utf-8')).hexdigest()
+        return f"{self.namespace}:{key}"
+
+    def _write(self, backend_key, value):
+        try:
+            data = self._encode(value)
+            if len(data) <= Config.SHARED_CACHE_MAX_ENTRY_BYTES:
+                self.backend.set(backend_key, data)
+        except Exception as e:
+            print(f"Warning: Could not write {self.namespace} cache entry: {e}")
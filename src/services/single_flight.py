@@ -0,0 +1,81 @@
+import threading
+
+# Import configuration using relative imports
+from ..config.config import Config
+from .cancellation import SharedCancellationToken
+
+
+class _Flight:
+    """An in-progress call that identical requests can attach to."""
+
+    def __init__(self, cancel_token):
+        self.token = SharedCancellationToken(cancel_token)
+        self.done = threading.Event()
+        self.result = None
+        self.followers = 0
+
+
+class SingleFlight:
+    """
+    Coalesce identical in-flight calls.
+
+    The first caller for a key runs the work; callers arriving with the same
+    key while it is running wait for it and receive the same result. Nothing
+    is kept once the call finishes, so this is independent of any cache of
+    completed results.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._flights = {}
+
+    def do(self, key, fn, cancel_token):
+        """
+        Run fn once per key among concurrent callers.
+
+        Args:
+            key (str): Identity of the work
+            fn (callable): Called as fn(shared_cancel_token) by the leader
+            cancel_token (CancellationToken): This caller's cancellation token
+
+        Returns:
+            tuple: (result, coalesced) where coalesced is True for followers
+
+        Raises:
+            GenerationCancelled: If this caller's token fires while waiting
+        """
+        with self._lock:
+            flight = self._flights.get(key)
+            if flight is not None and flight.token.attach(cancel_token):
+                flight.followers += 1
+                leader = False
+            else:
+                flight = _Flight(cancel_token)
+                self._flights[key] = flight
+                leader = True
+
+        if leader:
+            try:
+                flight.result = fn(flight.token)
+            finally:
+                with self._lock:
+                    if self._flights.get(key) is flight:
+                        del self._flights[key]
+                flight.done.set()
+            return flight.result, False
+
+        while not flight.done.wait(Config.DISCONNECT_POLL_INTERVAL):
+            cancel_token.check()
+        if flight.result is None or flight.token.reason is not None:
+            # The leader failed or its work was abandoned; run it for this caller
+            cancel_token.check()
+            return self.do(key, fn, cancel_token)
+        return flight.result, True
+
+    def get_stats(self):
+        """Get the number of in-flight calls and attached followers."""
+        with self._lock:
+            return {
+                'in_flight': len(self._flights),
+                'followers': sum(f.followers for f in self._flights.values())
+            }
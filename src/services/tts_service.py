@@ -1,24 +1,87 @@
 import torch
 import torchaudio as ta
+import gc
+import hashlib
+import io
+import json
+import queue
+import threading
 import time
 import uuid
 import os
+from contextlib import contextmanager
 from datetime import datetime
-from chatterbox.tts import ChatterboxTTS
 
 # Import configuration using relative imports
 from ..config.config import Config, DeviceConfig
+from .scheduler import FairScheduler
+from .cancellation import CancellationToken, GenerationCancelled
+from .single_flight import SingleFlight
+from .cache import LRUCache
+from .shared_cache import TieredCache, create_cache_backend
+from .audio_processing import crossfade_concat, postprocess_audio, audio_save_kwargs, waveform_summary
+from .output_writer import OutputWriter
+from .presets import resolve_preset, split_generation_params, decoding_overrides
+from .incremental_vocoder import incremental_vocoding
+from .model_loader import LoadedModel, MPS_CHANNEL_LIMIT_ERROR, load_model, model_version_for, release_model
+from ..utils import (sanitize_text, split_text_into_sentences, iter_text_chunks, get_output_filepath,
+                     get_waveform_sidecar_path)
+
+
+# Calls that run once per decoding step; cancellation is checked before each call.
+# Modules get a forward pre-hook. Methods are wrapped on the instance instead:
+# ConditionalCFM.forward_estimator calls self.estimator.forward() directly,
+# which bypasses the estimator's hooks.
+CANCELLATION_CHECKPOINTS = (
+    ('t3', 'tfmr'),                                     # T3 autoregressive transformer
+    ('s3gen', 'flow', 'decoder', 'forward_estimator'),  # S3Gen flow-matching ODE step
+)
 
 
 class TTSService:
     """Text-to-Speech service handling model loading and audio generation."""
     
     def __init__(self, lazy_load=False):
-        self.model = None
         self.device = None
         self.audio_history = []
-        self._model_loaded = False
         self._lazy_load = lazy_load
+        self._loaded = None  # Current LoadedModel; generations pin the one they started on
+        self._model_lock = threading.Condition()  # Guards loading, swaps and pin counts
+        self.checkpoint_dir = Config.MODEL_CHECKPOINT_DIR
+        self._configured_version = model_version_for(self.checkpoint_dir, Config.MODEL_VERSION)
+        self.model_swap_status = {'state': 'idle'}
+        self._swap_thread = None
+        self.scheduler = FairScheduler()
+        self.output_writer = OutputWriter()
+        self.single_flight = SingleFlight()
+        self._voice_hashes = {}  # voice file -> ((size, mtime), sha256)
+        
+        # Audio and voice conditionals are shared with other replicas through the backend
+        self.cache_backend = create_cache_backend()
+        submit = self.output_writer.submit
+        self.phrase_cache = TieredCache(LRUCache(Config.PHRASE_CACHE_MAX_BYTES),
+                                        self.cache_backend, 'phrase', submit=submit)
+        self.result_cache = TieredCache(LRUCache(Config.RESULT_CACHE_MAX_BYTES),
+                                        self.cache_backend, 'result', submit=submit)
+        self.conds_cache = TieredCache(LRUCache(Config.VOICE_CONDS_CACHE_ITEMS, sizeof=lambda conds: 1),
+                                       self.cache_backend, 'conds', encode=self._encode_conditionals,
+                                       decode=self._decode_conditionals, submit=submit)
+        self.preset_stats = {name: {'runs': 0, 'audio_seconds': 0.0, 'synthesis_seconds': 0.0}
+                             for name in Config.GENERATION_PRESETS}
+        self.warmup_status = {'state': 'idle', 'total': 0, 'warmed': 0, 'skipped': 0, 'failed': 0}
+        self.stream_stats = {'streams': 0, 'first_audio_seconds': 0.0, 'max_first_audio_seconds': 0.0}
+        self.metrics = {
+            'completed': 0,
+            'failed': 0,
+            'cancelled': 0,
+            'coalesced': 0,
+            'cache_hits': 0,
+            CancellationToken.DEADLINE: 0,
+            CancellationToken.DISCONNECTED: 0,
+        }
+        self._metrics_lock = threading.Lock()
+        self._local = threading.local()  # Holds the cancel token of the generating thread
+        self._stopping = threading.Event()
         
         if not lazy_load:
             self._initialize()
@@ -42,12 +105,32 @@ class TTSService:
         """Create output directory if it doesn't exist."""
         os.makedirs(Config.OUTPUT_DIR, exist_ok=True)
     
+    @property
+    def model(self):
+        """The model of the generation running on this thread, else the current model."""
+        loaded = self._active_model()
+        return loaded.model if loaded else None
+    
+    @property
+    def model_version(self):
+        """Version of the model that serves (or is serving) this thread's requests."""
+        loaded = self._active_model()
+        return loaded.version if loaded else self._configured_version
+    
+    @property
+    def _model_loaded(self):
+        return self._loaded is not None
+    
+    def _active_model(self):
+        """Get the LoadedModel pinned to this thread, or the current one."""
+        return getattr(self._local, 'loaded', None) or self._loaded
+    
     def _ensure_model_loaded(self):
         """Ensure the model is loaded (lazy loading)."""
-        if not self._model_loaded:
-            print("Loading ChatterboxTTS model (first request)...")
-            self._load_model()
-            self._model_loaded = True
+        with self._model_lock:
+            if self._loaded is None:
+                print("Loading ChatterboxTTS model (first request)...")
+                self._load_model()
     
     def _load_model(self):
         """Load the ChatterboxTTS model with fallback handling."""
@@ -55,132 +138,832 @@ class TTSService:
             print("Loading ChatterboxTTS model...")
         
         start_time = time.time()
-        
-        try:
-            self.model = ChatterboxTTS.from_pretrained(device=self.device)
-            print(f"Model loaded successfully on {self.device}")
-        except Exception as e:
-            if self.device == "mps" and "Output channels > 65536 not supported" in str(e):
-                print(f"MPS device limitation detected. Falling back to CPU...")
-                self.device = "cpu"
-                torch.set_grad_enabled(False)  # Re-disable gradients for CPU
-                self.model = ChatterboxTTS.from_pretrained(device=self.device)
-                print(f"Model loaded successfully on CPU (MPS fallback)")
-            else:
-                raise e
+        model, self.device = load_model(self.device, self.checkpoint_dir)
         
         load_time = time.time() - start_time
         print(f"Model loaded in {load_time:.2f} seconds on {self.device}")
-        self._model_loaded = True
+        self._install_cancellation_hooks(model)
+        self._loaded = LoadedModel(model, self._configured_version, self.device)
+    
+    def _install_cancellation_hooks(self, model):
+        """Check the active cancel token before every decoding step of the model."""
+        def check_cancelled(*args):
+            token = getattr(self._local, 'token', None)
+            if token is not None:
+                token.check()
+        
+        def wrap(method):
+            def checked(*args, **kwargs):
+                check_cancelled()
+                return method(*args, **kwargs)
+            return checked
+        
+        for path in CANCELLATION_CHECKPOINTS:
+            owner = model
+            for attr in path[:-1]:
+                owner = getattr(owner, attr, None)
+            target = getattr(owner, path[-1], None)
+            if isinstance(target, torch.nn.Module):
+                target.register_forward_pre_hook(check_cancelled)
+            elif callable(target):
+                setattr(owner, path[-1], wrap(target))
+            else:
+                print(f"Warning: cancellation checkpoint {'.'.join(path)} not found on model")
+    
+    @contextmanager
+    def _pinned_model(self):
+        """
+        Pin the current model to this thread for the duration of a generation.
+        
+        Inside the block self.model and self.model_version refer to the pinned
+        model, so a hot swap only affects generations that start afterwards.
+        Nested blocks reuse the outer pin. Loads the model lazily if needed.
+        """
+        if getattr(self._local, 'loaded', None) is not None:
+            yield self._local.loaded
+            return
+        
+        self._ensure_model_loaded()
+        with self._model_lock:
+            loaded = self._loaded
+            loaded.active += 1
+        self._local.loaded = loaded
+        try:
+            yield loaded
+        finally:
+            # The MPS fallback may have moved the pin to a replacement model
+            loaded = self._local.loaded
+            self._local.loaded = None
+            with self._model_lock:
+                loaded.active -= 1
+                self._model_lock.notify_all()
+    
+    def _repin(self, loaded):
+        """Move this thread's pin to another model."""
+        with self._model_lock:
+            previous = getattr(self._local, 'loaded', None)
+            if previous is not None:
+                previous.active -= 1
+            loaded.active += 1
+            self._model_lock.notify_all()
+        self._local.loaded = loaded
+    
+    def _swap_model(self, loaded):
+        """
+        Make a loaded model current for new generations.
+        
+        Returns:
+            LoadedModel or None: The previous model, still used by pinned generations
+        """
+        with self._model_lock:
+            old, self._loaded = self._loaded, loaded
+        # Conditionals are tensors of the old model's device; drop the in-memory copies
+        self.conds_cache.clear()
+        print(f"Model {loaded.version} on {loaded.device} is now serving requests")
+        return old
+    
+    def _release_when_idle(self, old, timeout=None):
+        """
+        Wait for generations pinned to a swapped-out model, then free its weights.
+        
+        Returns:
+            bool: True if the model was released, False if it was still in use at the timeout
+        """
+        deadline = time.time() + (timeout if timeout is not None else Config.MODEL_SWAP_DRAIN_TIMEOUT)
+        with self._model_lock:
+            while old.active and time.time() < deadline:
+                self._model_lock.wait(deadline - time.time())
+            idle = not old.active
+        
+        if not idle:
+            # Its last generation drops the final reference when it finishes
+            print(f"Warning: Model {old.version} still in use after drain timeout; not released explicitly")
+            return False
+        
+        release_model(old)
+        gc.collect()
+        print(f"Released model {old.version}")
+        return True
     
-    def generate_audio(self, text, voice_file=None):
+    def _record_metric(self, *names):
+        """Increment generation counters."""
+        with self._metrics_lock:
+            for name in names:
+                self.metrics[name] = self.metrics.get(name, 0) + 1
+    
+    def get_metrics(self):
+        """Get generation outcome counters."""
+        with self._metrics_lock:
+            return dict(self.metrics)
+    
+    def generate_audio(self, text, voice_file=None, priority=None, client_key=None,
+                       cancel_token=None, audio_options=None, preset=None):
         """
         Generate audio from text with error handling and device fallback.
         
         Args:
             text (str): Text to convert to speech
             voice_file (str, optional): Path to voice recording for cloning
+            priority (str, optional): Scheduler priority class (e.g. 'interactive', 'batch')
+            client_key (str, optional): Key identifying the client for fair scheduling
+            cancel_token (CancellationToken, optional): Deadline / disconnect tracking;
+                defaults to a token with the configured request timeout
+            audio_options (dict, optional): Post-processing options from
+                resolve_audio_options; None keeps the model's native output
+            preset (str, optional): Speed/quality preset name (e.g. 'draft', 'final')
             
         Returns:
             dict: Generation result with audio info or error
         """
-        if not text or not text.strip():
+        # The same sanitized text is used for the cache key, the sentence split and synthesis
+        text = sanitize_text(text)
+        if not text:
             return {'error': 'Please provide text to convert'}
         
         if len(text) > Config.MAX_TEXT_LENGTH:
             return {'error': f'Text too long. Maximum {Config.MAX_TEXT_LENGTH} characters.'}
         
-        # Ensure model is loaded (lazy loading)
-        self._ensure_model_loaded()
+        if cancel_token is None:
+            cancel_token = CancellationToken(timeout=Config.REQUEST_TIMEOUT)
+        
+        try:
+            params = self._generation_params(preset)
+        except ValueError as e:
+            return {'error': str(e)}
+        
+        key = self._request_key(text, voice_file, params)
+        variant_key = self._variant_key(key, audio_options)
         
-        print(f"Generating audio for: '{text}'")
-        generation_start = time.time()
+        # Finished audio for the same request needs no model slot at all
+        cached = self._cached_audio(key, audio_options)
+        if cached is not None:
+            print(f"Serving cached audio for: '{text}'")
+            self._record_metric('cache_hits')
+            return self._store_audio(text, *cached, generation_start=time.time(),
+                                     audio_options=audio_options, extra={'cached': True})
+        
+        # Identical requests already in flight share a single model pass. Only
+        # requests of the same priority class coalesce, so interactive work
+        # never waits in the queue behind a batch leader
+        flight_key = f"{variant_key}:{self.scheduler.normalize_priority(priority)}"
+        try:
+            result, coalesced = self.single_flight.do(
+                flight_key,
+                lambda shared_token: self._run_generation(
+                    text, voice_file, params, audio_options, priority, client_key, shared_token),
+                cancel_token
+            )
+            
+            # Shared work outlives the deadlines of all but its latest member
+            cancel_token.check()
+        except GenerationCancelled as e:
+            return self._cancelled_result(e)
         
+        if coalesced:
+            print(f"Coalesced with in-flight generation for: '{text}'")
+            self._record_metric('coalesced')
+            result = dict(result, coalesced=True)
+        return result
+    
+    def _run_generation(self, text, voice_file, params, audio_options, priority, client_key,
+                        cancel_token):
+        """Wait for a model slot, synthesize, post-process, save the file and record history."""
         try:
-            # Generate unique filename
-            audio_id = str(uuid.uuid4())
-            filename = f"audio_{audio_id}.{Config.AUDIO_FORMAT}"
-            filepath = os.path.join(Config.OUTPUT_DIR, filename)
-            
-            # Generate audio with fallback handling
-            wav = self._generate_with_fallback(text, voice_file)
-            
-            # Save audio file
-            ta.save(filepath, wav, self.model.sr)
-            generation_time = time.time() - generation_start
-            
-            # Create audio entry
-            audio_entry = {
-                'id': audio_id,
-                'text': text,
-                'filename': filename,
-                'filepath': filepath,
-                'timestamp': datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
-                'generation_time': f"{generation_time:.2f}s"
-            }
-            
-            # Add to history and manage cleanup
-            self._add_to_history(audio_entry)
-            
-            print(f"Audio generated in {generation_time:.2f} seconds")
-            
-            return {
-                'success': True,
-                'audio_id': audio_id,
-                'filename': filename,
-                'generation_time': generation_time,
-                'filepath': filepath
-            }
+            wav, sample_rate, ticket = self._render(
+                text, voice_file, params, audio_options, priority, client_key, cancel_token)
             
+            # Skip writing a file nobody will fetch
+            cancel_token.check()
+            
+            self._record_metric('completed')
+            return self._store_audio(text, wav, sample_rate, ticket.started_at,
+                                     audio_options=audio_options, extra={
+                                         'queue_time': ticket.wait_time,
+                                         'priority': ticket.priority,
+                                         'preset': params['preset']
+                                     })
+        
+        except GenerationCancelled as e:
+            return self._cancelled_result(e)
         except Exception as e:
             error_msg = f'Generation failed: {str(e)}'
             print(f"Error generating TTS: {error_msg}")
+            self._record_metric('failed')
             return {'error': error_msg}
     
-    def _generate_with_fallback(self, text, voice_file=None):
-        """Generate audio with MPS fallback handling."""
-        with torch.no_grad():
-            try:
-                # Prepare generation parameters
-                gen_params = {
-                    'text': text,
-                    'cfg_weight': Config.DEFAULT_CFG_WEIGHT,
-                    'exaggeration': Config.DEFAULT_EXAGGERATION
-                }
+    def _render(self, text, voice_file, params, audio_options, priority, client_key, cancel_token):
+        """
+        Synthesize a request on the model and post-process it, filling the result cache.
+        
+        Returns:
+            tuple: (waveform, sample rate, scheduler ticket)
+        """
+        # Wait for a model slot; interactive work is served ahead of batch work
+        with self.scheduler.slot(priority, client_key, cancel_token=cancel_token) as ticket:
+            # Don't start work for a client that already went away
+            cancel_token.check()
+            
+            # Keep the current model (loading it lazily) even if a swap happens meanwhile
+            with self._pinned_model():
+                print(f"Generating audio for: '{text}' [{ticket.priority}, waited {ticket.wait_time:.2f}s]")
+                
+                # Cache under the version of the model that renders the audio
+                key = self._request_key(text, voice_file, params)
+                
+                # Synthesize sentence by sentence; decoding steps check the token
+                self._local.token = cancel_token
+                try:
+                    wav = self._synthesize(text, voice_file, params, cancel_token)
+                finally:
+                    self._local.token = None
+                sample_rate = self.model.sr
+        
+        # Post-processing is CPU work and runs after the model slot is released
+        self.result_cache.put(key, (wav, sample_rate))
+        wav, sample_rate = self._render_variant(key, wav, sample_rate, audio_options)
+        return wav, sample_rate, ticket
+    
+    def synthesize(self, text, voice_file=None, preset=None, audio_options=None,
+                   priority='batch', client_key='offline', cancel_token=None):
+        """
+        Synthesize text to a waveform without saving a file or touching history.
+        
+        Used by offline tools such as the bulk synthesis command; shares the
+        scheduler and caches with web requests.
+        
+        Args:
+            text (str): Text to convert to speech
+            voice_file (str, optional): Path to voice recording for cloning
+            preset (str, optional): Speed/quality preset name
+            audio_options (dict, optional): Post-processing options from resolve_audio_options
+            priority (str): Scheduler priority class
+            client_key (str): Key identifying the caller for fair scheduling
+            cancel_token (CancellationToken, optional): Cancellation / deadline tracking
+            
+        Returns:
+            tuple: (waveform tensor, sample rate, cached flag)
+            
+        Raises:
+            ValueError: If the text or preset is invalid
+            GenerationCancelled: If the cancel token fired
+        """
+        text = sanitize_text(text)
+        if not text:
+            raise ValueError('Please provide text to convert')
+        if len(text) > Config.MAX_TEXT_LENGTH:
+            raise ValueError(f'Text too long. Maximum {Config.MAX_TEXT_LENGTH} characters.')
+        
+        params = self._generation_params(preset)
+        key = self._request_key(text, voice_file, params)
+        cached = self._cached_audio(key, audio_options)
+        if cached is not None:
+            self._record_metric('cache_hits')
+            return cached[0], cached[1], True
+        
+        wav, sample_rate, _ = self._render(text, voice_file, params, audio_options, priority,
+                                           client_key, cancel_token or CancellationToken())
+        self._record_metric('completed')
+        return wav, sample_rate, False
+    
+    def _cached_audio(self, key, audio_options):
+        """Get finished audio for a request variant from the result cache, or None."""
+        variant_key = self._variant_key(key, audio_options)
+        cached = self.result_cache.get(variant_key)
+        if cached is None and variant_key != key:
+            # A different variant of the same speech only needs post-processing
+            raw = self.result_cache.get(key)
+            if raw is not None:
+                cached = self._render_variant(key, *raw, audio_options)
+        return cached
+    
+    def _variant_key(self, key, audio_options):
+        """Get the cache key of a post-processed variant of a request."""
+        if not audio_options:
+            return key
+        return f"{key}:{json.dumps(audio_options, sort_keys=True)}"
+    
+    def _render_variant(self, key, wav, sample_rate, audio_options):
+        """Post-process raw model audio into the requested variant, caching the result."""
+        if not audio_options:
+            return wav, sample_rate
+        
+        variant = postprocess_audio(wav, sample_rate, audio_options)
+        self.result_cache.put(self._variant_key(key, audio_options), variant)
+        return variant
+    
+    def _store_audio(self, text, wav, sample_rate, generation_start, audio_options=None, extra=None):
+        """Save a waveform as a new audio file, add it to history and build the result."""
+        # Generate unique filename
+        audio_id = str(uuid.uuid4())
+        filename = f"audio_{audio_id}.{Config.AUDIO_FORMAT}"
+        filepath = get_output_filepath(filename)
+        
+        # Save audio file in the background; file routes wait for pending writes
+        self.output_writer.save(filepath, wav, sample_rate, **audio_save_kwargs(audio_options))
+        generation_time = time.time() - generation_start
+        
+        # Duration and peaks let clients draw the clip without downloading it
+        summary = waveform_summary(wav, sample_rate)
+        
+        # Create audio entry
+        audio_entry = {
+            'id': audio_id,
+            'text': text,
+            'filename': filename,
+            'filepath': filepath,
+            'timestamp': datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
+            'generation_time': f"{generation_time:.2f}s",
+            'duration': summary['duration'],
+            'peaks': summary['peaks']
+        }
+        
+        # Add to history and manage cleanup
+        self._add_to_history(audio_entry)
+        
+        print(f"Audio generated in {generation_time:.2f} seconds")
+        
+        result = {
+            'success': True,
+            'audio_id': audio_id,
+            'filename': filename,
+            'generation_time': generation_time,
+            'sample_rate': sample_rate,
+            'filepath': filepath,
+            'duration': summary['duration'],
+            'peaks': summary['peaks']
+        }
+        result.update(extra or {})
+        return result
+    
+    def _cancelled_result(self, error):
+        """Record a cancelled request and build its result."""
+        print(f"Generation cancelled: {error.reason}")
+        self._record_metric('cancelled', error.reason)
+        return {'error': f'Generation cancelled: {error.reason}', 'cancelled': True, 'reason': error.reason}
+    
+    def _generation_params(self, preset=None):
+        """Get the model generation parameters for a request's preset."""
+        return resolve_preset(preset)
+    
+    def resolve_voice_file(self, voice):
+        """Resolve a voice given as a path or as a saved voice recording filename."""
+        if not voice or os.path.exists(voice):
+            return voice
+        return os.path.join(Config.OUTPUT_DIR, 'voice_clone', os.path.basename(voice))
+    
+    def _voice_hash(self, voice_file):
+        """Get the content hash of a voice file, memoized by size and mtime."""
+        if not voice_file or not os.path.exists(voice_file):
+            return None
+        
+        stat = os.stat(voice_file)
+        signature = (stat.st_size, stat.st_mtime_ns)
+        cached = self._voice_hashes.get(voice_file)
+        if cached and cached[0] == signature:
+            return cached[1]
+        
+        digest = hashlib.sha256()
+        with open(voice_file, 'rb') as f:
+            for block in iter(lambda: f.read(1024 * 1024), b''):
+                digest.update(block)
+        self._voice_hashes[voice_file] = (signature, digest.hexdigest())
+        return digest.hexdigest()
+    
+    def _request_key(self, text, voice_file, params):
+        """Build the identity of a request from its sanitized text, voice and parameters."""
+        payload = {
+            'text': text,
+            'voice': self._voice_hash(voice_file),
+            'params': params,
+            'model': self.model_version
+        }
+        return hashlib.sha256(json.dumps(payload, sort_keys=True).encode('utf-8')).hexdigest()
+    
+    def _synthesize(self, text, voice_file, params, cancel_token):
+        """
+        Synthesize text chunk by chunk, reusing cached phrase audio.
+        
+        Each sentence is cached by (sentence, voice, params), so texts that
+        share greetings or disclaimers only send their new sentences to the model.
+        
+        Returns:
+            torch.Tensor: Stitched waveform
+        """
+        if not Config.PHRASE_CACHE_ENABLED:
+            return self._generate_with_fallback(text, voice_file, params)
+        
+        voice_hash = self._voice_hash(voice_file)
+        segments = []
+        for sentence in self._split_text(text):
+            cancel_token.check()
+            segments.append(self._synthesize_sentence(sentence, voice_file, voice_hash, params))
+        
+        return crossfade_concat(segments, self.model.sr, Config.AUDIO_OVERLAP_MS)
+    
+    def _split_text(self, text):
+        """
+        Split text into sentence pieces sized for one model pass.
+        
+        Pieces are measured in model text tokens once the tokenizer is loaded,
+        and in characters otherwise.
+        
+        Returns:
+            List[str]: Sentences, with over-long ones divided evenly
+        """
+        encode = getattr(getattr(self.model, 'tokenizer', None), 'encode', None)
+        if encode is None:
+            return split_text_into_sentences(text, Config.STREAMING_CHUNK_SIZE)
+        return list(iter_text_chunks(text, Config.CHUNK_MAX_TOKENS,
+                                     cost=lambda piece: len(encode(piece)), pack=False))
+    
+    def _synthesize_sentence(self, sentence, voice_file, voice_hash, params, on_audio=None):
+        """
+        Synthesize one sentence, using the phrase cache when possible.
+        
+        Streamed audio (on_audio given) is vocoded in separate windows joined
+        by crossfades, so it is cached under its own key and only replayed to
+        other streams; streams still reuse full renders.
+        """
+        key = (sentence, voice_hash, tuple(sorted(params.items())), self.model_version)
+        streamed_key = key + ('streamed',)
+        wav = self.phrase_cache.get(key)
+        if wav is None and on_audio is not None:
+            wav = self.phrase_cache.get(streamed_key)
+        if wav is None:
+            wav = self._generate_with_fallback(sentence, voice_file, params, on_audio)
+            self.phrase_cache.put(key if on_audio is None else streamed_key, wav)
+        elif on_audio is not None:
+            on_audio(wav[0])
+        return wav
+    
+    def stream_audio(self, text, voice_file=None, priority=None, client_key=None,
+                     cancel_token=None, preset=None):
+        """
+        Generate audio with incremental vocoding, yielding it while it is produced.
+        
+        Speech tokens are vocoded in small windows as T3 generates them, so the
+        first audio is available after a fraction of a second instead of after
+        the whole first sentence. Nothing is saved to disk or history.
+        
+        Args:
+            text (str): Text to convert to speech
+            voice_file (str, optional): Path to voice recording for cloning
+            priority (str, optional): Scheduler priority class
+            client_key (str, optional): Key identifying the client for fair scheduling
+            cancel_token (CancellationToken, optional): Deadline / disconnect tracking
+                for the whole stream; defaults to a token with the configured request timeout
+            preset (str, optional): Speed/quality preset name
+            
+        The stream is also cancelled if no audio arrives within STREAMING_TIMEOUT.
+        
+        Returns:
+            generator: Yields (sample rate, 1-D float waveform chunk) tuples
+            
+        Raises:
+            ValueError: If the text or preset is invalid
+        """
+        text = sanitize_text(text)
+        if not text:
+            raise ValueError('Please provide text to convert')
+        if len(text) > Config.MAX_TEXT_LENGTH:
+            raise ValueError(f'Text too long. Maximum {Config.MAX_TEXT_LENGTH} characters.')
+        
+        params = self._generation_params(preset)
+        if cancel_token is None:
+            cancel_token = CancellationToken(timeout=Config.REQUEST_TIMEOUT)
+        return self._stream_chunks(text, voice_file, params, priority, client_key, cancel_token)
+    
+    def _stream_chunks(self, text, voice_file, params, priority, client_key, cancel_token):
+        """Run a streaming generation on a worker thread and relay its chunks."""
+        chunks = queue.Queue()
+        worker = threading.Thread(
+            target=self._run_stream,
+            args=(text, voice_file, params, priority, client_key, cancel_token, chunks.put),
+            name='tts-stream', daemon=True)
+        worker.start()
+        
+        finished = False
+        first_audio_deadline = time.time() + Config.STREAMING_TIMEOUT
+        try:
+            while True:
+                try:
+                    # Until audio starts, give up after STREAMING_TIMEOUT (e.g. stuck in the queue)
+                    wait = max(0.0, first_audio_deadline - time.time()) if first_audio_deadline else None
+                    item = chunks.get(timeout=wait)
+                except queue.Empty:
+                    print(f"Stream produced no audio within {Config.STREAMING_TIMEOUT}s; cancelling")
+                    cancel_token.cancel(CancellationToken.DEADLINE)
+                    return
+                first_audio_deadline = None
+                if item is None:
+                    finished = True
+                    return
+                yield item
+        finally:
+            if not finished:
+                # The consumer went away (generator closed); stop the model work
+                cancel_token.cancel(CancellationToken.DISCONNECTED)
+    
+    def _run_stream(self, text, voice_file, params, priority, client_key, cancel_token, emit):
+        """Streaming worker: synthesize sentence by sentence, emitting audio as it is vocoded."""
+        stream_start = time.time()
+        first_audio = []
+        
+        try:
+            # The stream keeps the model it started on, even across a hot swap
+            with self.scheduler.slot(priority, client_key, cancel_token=cancel_token) as ticket, \
+                    self._pinned_model():
+                cancel_token.check()
+                sample_rate = self.model.sr
                 
-                # Add voice file if provided
-                if voice_file and os.path.exists(voice_file):
-                    gen_params['audio_prompt_path'] = voice_file
-                    print(f"Using voice cloning with: {voice_file}")
+                def on_audio(chunk):
+                    if not first_audio:
+                        first_audio.append(time.time() - stream_start)
+                    emit((sample_rate, chunk))
                 
-                wav = self.model.generate(**gen_params)
-                return wav
+                print(f"Streaming audio for: '{text}' [{ticket.priority}, waited {ticket.wait_time:.2f}s]")
+                voice_hash = self._voice_hash(voice_file)
+                self._local.token = cancel_token
+                try:
+                    for sentence in self._split_text(text):
+                        cancel_token.check()
+                        if Config.PHRASE_CACHE_ENABLED:
+                            self._synthesize_sentence(sentence, voice_file, voice_hash, params, on_audio)
+                        else:
+                            self._generate_with_fallback(sentence, voice_file, params, on_audio)
+                finally:
+                    self._local.token = None
+            
+            self._record_metric('completed')
+            if first_audio:
+                self._record_stream(first_audio[0])
+        
+        except GenerationCancelled as e:
+            self._cancelled_result(e)
+        except Exception as e:
+            # Headers are already sent; the stream just ends early
+            print(f"Error streaming TTS: Generation failed: {str(e)}")
+            self._record_metric('failed')
+        finally:
+            emit(None)
+    
+    def _record_stream(self, first_audio_seconds):
+        """Accumulate time-to-first-audio of completed streams."""
+        with self._metrics_lock:
+            stats = self.stream_stats
+            stats['streams'] += 1
+            stats['first_audio_seconds'] += first_audio_seconds
+            stats['max_first_audio_seconds'] = max(stats['max_first_audio_seconds'], first_audio_seconds)
+    
+    def get_stream_stats(self):
+        """Get the number of completed streams and their time-to-first-audio."""
+        with self._metrics_lock:
+            stats = dict(self.stream_stats)
+        streams = stats['streams']
+        return {
+            'streams': streams,
+            'avg_first_audio_seconds': round(stats['first_audio_seconds'] / streams, 3) if streams else None,
+            'max_first_audio_seconds': round(stats['max_first_audio_seconds'], 3)
+        }
+    
+    def start_cache_warmup(self, manifest_path):
+        """
+        Pre-render phrases from a manifest into the caches in a background thread.
+        
+        The manifest is a JSON list or JSON Lines file of {"text": ..., "voice": ...}
+        objects; "voice" is optional and may be a path or a saved voice filename,
+        and an optional "preset" selects the speed/quality preset.
+        Rendering runs in the 'background' scheduler class one sentence at a time,
+        so live requests never wait behind more than a single sentence.
+        
+        Args:
+            manifest_path (str): Path to the warm-up manifest
+        """
+        thread = threading.Thread(target=self._run_cache_warmup, args=(manifest_path,),
+                                  name='cache-warmup', daemon=True)
+        thread.start()
+        return thread
+    
+    def _run_cache_warmup(self, manifest_path):
+        """Warm-up thread body."""
+        try:
+            entries = self._read_warmup_manifest(manifest_path)
+        except (OSError, ValueError) as e:
+            print(f"Warning: Could not read warm-up manifest {manifest_path}: {e}")
+            self.warmup_status['state'] = 'failed'
+            return
+        
+        self.warmup_status.update(state='running', total=len(entries))
+        print(f"Warming caches with {len(entries)} phrases from {manifest_path}...")
+        
+        for entry in entries:
+            if self._stopping.is_set():
+                break
+            try:
+                if self.warm_cache(entry['text'], entry.get('voice'), entry.get('preset')):
+                    self.warmup_status['warmed'] += 1
+                else:
+                    self.warmup_status['skipped'] += 1
+            except Exception as e:
+                print(f"Warning: Could not warm phrase '{entry.get('text')}': {e}")
+                self.warmup_status['failed'] += 1
+        
+        self.warmup_status['state'] = 'stopped' if self._stopping.is_set() else 'done'
+        print(f"Cache warm-up done: {self.warmup_status['warmed']} warmed, "
+              f"{self.warmup_status['skipped']} skipped, {self.warmup_status['failed']} failed")
+    
+    def _read_warmup_manifest(self, manifest_path):
+        """Read (text, voice) entries from a JSON or JSON Lines manifest."""
+        with open(manifest_path, 'r', encoding='utf-8') as f:
+            content = f.read()
+        
+        if content.lstrip().startswith('['):
+            entries = json.loads(content)
+        else:
+            entries = [json.loads(line) for line in content.splitlines() if line.strip()]
+        
+        return [entry for entry in entries if isinstance(entry, dict) and entry.get('text')]
+    
+    def warm_cache(self, text, voice_file=None, preset=None):
+        """
+        Render text into the phrase and result caches at background priority.
+        
+        Args:
+            text (str): Text to pre-render
+            voice_file (str, optional): Voice file path or saved voice filename
+            preset (str, optional): Speed/quality preset name
+            
+        Returns:
+            bool: True if audio was rendered, False if it was already cached
+        """
+        text = sanitize_text(text)[:Config.MAX_TEXT_LENGTH]
+        voice_file = self.resolve_voice_file(voice_file)
+        
+        params = self._generation_params(preset)
+        
+        # The chunker measures text with the model's tokenizer
+        with self.scheduler.slot('background', 'warmup'):
+            self._ensure_model_loaded()
+        
+        # All sentences are rendered by the same model, even across a hot swap
+        with self._pinned_model():
+            key = self._request_key(text, voice_file, params)
+            if key in self.result_cache:
+                return False
+            
+            voice_hash = self._voice_hash(voice_file)
+            segments = []
+            for sentence in self._split_text(text):
+                # One slot per sentence, so a live request waits at most one sentence
+                with self.scheduler.slot('background', 'warmup'):
+                    segments.append(self._synthesize_sentence(sentence, voice_file, voice_hash, params))
+            
+            if segments:
+                wav = crossfade_concat(segments, self.model.sr, Config.AUDIO_OVERLAP_MS)
+                self.result_cache.put(key, (wav, self.model.sr))
+        return True
+    
+    def _generate_with_fallback(self, text, voice_file=None, params=None, on_audio=None):
+        """
+        Generate audio with MPS fallback handling.
+        
+        Args:
+            text (str): Text to convert to speech
+            voice_file (str, optional): Path to voice recording for cloning
+            params (dict, optional): Preset generation parameters
+            on_audio (callable, optional): Receives waveform chunks while the
+                model is still generating (incremental vocoding)
+            
+        Returns:
+            torch.Tensor: Generated waveform
+        """
+        params = params or self._generation_params()
+        synthesis_start = time.time()
+        
+        with torch.no_grad():
+            # Prepare generation parameters
+            gen_params, overrides = split_generation_params(self.model, params)
+            gen_params['text'] = text
+            
+            if voice_file and os.path.exists(voice_file):
+                print(f"Using voice cloning with: {voice_file}")
+            
+            def generate():
+                self._apply_voice(voice_file, gen_params)
+                with decoding_overrides(self.model, **overrides):
+                    if on_audio is None:
+                        return self.model.generate(**gen_params)
+                    with incremental_vocoding(self.model, on_audio) as vocoder:
+                        return vocoder.finish(self.model.generate(**gen_params))
+            
+            try:
+                wav = generate()
             except RuntimeError as e:
-                if "Output channels > 65536 not supported" in str(e):
+                if MPS_CHANNEL_LIMIT_ERROR in str(e):
                     print(f"MPS limitation during generation. Moving model to CPU...")
                     self.device = "cpu"
-                    # Recreate the model on CPU instead of using .to()
-                    self.model = ChatterboxTTS.from_pretrained(device=self.device)
+                    # Recreate the model on CPU instead of using .to(), and hot-swap
+                    # it in so later requests use it while the MPS copy is released
+                    model, self.device = load_model(self.device, self.checkpoint_dir)
+                    self._install_cancellation_hooks(model)
+                    loaded = LoadedModel(model, self.model_version, self.device)
+                    old = self._swap_model(loaded)
+                    self._repin(loaded)
+                    if old is not None:
+                        threading.Thread(target=self._release_when_idle, args=(old,),
+                                         name='model-release', daemon=True).start()
                     
                     # Retry generation with same parameters
-                    wav = self.model.generate(**gen_params)
+                    wav = generate()
                     print(f"Generation completed on CPU (MPS fallback)")
-                    return wav
                 else:
                     raise e
+        
+        self._record_synthesis(params['preset'], wav, time.time() - synthesis_start)
+        return wav
+    
+    def _apply_voice(self, voice_file, gen_params):
+        """
+        Set the model's conditionals for a voice, reusing cached ones.
+        
+        Computing conditionals (speaker embedding, prompt tokens and mels)
+        costs a pass over the reference audio, so they are cached per model
+        version and voice content hash and shared with other replicas. Requests without a voice
+        get the model's built-in voice back. Models that cannot save their
+        conditionals get the voice file passed to generate instead.
+        
+        Args:
+            voice_file (str): Path to voice recording, or None for the built-in voice
+            gen_params (dict): model.generate kwargs, updated in place
+        """
+        gen_params.pop('audio_prompt_path', None)
+        default_conds = self._active_model().default_conds
+        if not voice_file or not os.path.exists(voice_file):
+            if default_conds is not None:
+                self.model.conds = default_conds
+            return
+        
+        if not hasattr(self.model, 'prepare_conditionals') or not hasattr(default_conds, 'save'):
+            gen_params['audio_prompt_path'] = voice_file
+            return
+        
+        key = f"{self.model_version}:{self._voice_hash(voice_file)}"
+        conds = self.conds_cache.get(key)
+        if conds is None:
+            self.model.prepare_conditionals(
+                voice_file, exaggeration=gen_params.get('exaggeration', Config.DEFAULT_EXAGGERATION))
+            conds = self.model.conds
+            self.conds_cache.put(key, conds)
+        self.model.conds = conds
+    
+    def _encode_conditionals(self, conds):
+        """Serialize voice conditionals to bytes."""
+        buffer = io.BytesIO()
+        conds.save(buffer)
+        return buffer.getvalue()
+    
+    def _decode_conditionals(self, data):
+        """Load serialized voice conditionals onto the model's device."""
+        loaded = self._active_model()
+        conds = type(loaded.default_conds).load(io.BytesIO(data), map_location='cpu')
+        return conds.to(loaded.device)
+    
+    def _record_synthesis(self, preset, wav, seconds):
+        """Accumulate model time and audio length per preset for RTF reporting."""
+        stats = self.preset_stats.setdefault(
+            preset, {'runs': 0, 'audio_seconds': 0.0, 'synthesis_seconds': 0.0})
+        with self._metrics_lock:
+            stats['runs'] += 1
+            stats['audio_seconds'] += wav.shape[-1] / self.model.sr
+            stats['synthesis_seconds'] += seconds
+    
+    def get_presets(self):
+        """
+        Get the available presets with their settings and measured real-time factor.
+        
+        RTF is model time divided by audio duration; below 1.0 is faster than real time.
+        """
+        presets = {}
+        with self._metrics_lock:
+            for name, settings in Config.GENERATION_PRESETS.items():
+                stats = self.preset_stats.get(name, {})
+                audio_seconds = stats.get('audio_seconds', 0.0)
+                presets[name] = {
+                    'settings': settings,
+                    'runs': stats.get('runs', 0),
+                    'rtf': round(stats['synthesis_seconds'] / audio_seconds, 3) if audio_seconds else None,
+                    'default': name == Config.DEFAULT_PRESET
+                }
+        return presets
     
     def _add_to_history(self, audio_entry):
         """Add audio entry to history and manage cleanup."""
         self.audio_history.insert(0, audio_entry)  # Add to beginning
         
-        # Keep only last N entries and cleanup old files
+        # Keep only last N entries and cleanup old files in the background
         if len(self.audio_history) > Config.MAX_HISTORY_ITEMS:
             old_entry = self.audio_history.pop()
-            if os.path.exists(old_entry['filepath']):
-                try:
-                    os.remove(old_entry['filepath'])
-                except OSError as e:
-                    print(f"Warning: Could not remove old audio file {old_entry['filepath']}: {e}")
+            self.output_writer.remove(old_entry['filepath'])
     
     def get_audio_history(self):
         """Get the current audio generation history."""
@@ -188,18 +971,179 @@ class TTSService:
     
     def get_audio_filepath(self, filename):
         """Get the full filepath for an audio file."""
-        return os.path.join(Config.OUTPUT_DIR, filename)
+        filepath = get_output_filepath(filename)
+        legacy_filepath = os.path.join(Config.OUTPUT_DIR, filename)
+        if not os.path.exists(filepath) and os.path.exists(legacy_filepath):
+            return legacy_filepath  # Written before outputs were sharded
+        return filepath
     
     def file_exists(self, filename):
-        """Check if an audio file exists."""
+        """Check if an audio file exists, waiting briefly for a pending write."""
+        self.output_writer.wait_for(get_output_filepath(filename), Config.OUTPUT_WRITE_WAIT_TIMEOUT)
         filepath = self.get_audio_filepath(filename)
         return os.path.exists(filepath)
     
+    def get_waveform(self, filename):
+        """
+        Get the duration and peak envelope of a generated audio file.
+        
+        Entries still in history carry their summary; older files are
+        decoded on demand.
+        
+        Args:
+            filename (str): Generated audio filename
+            
+        Returns:
+            dict or None: {'duration', 'peaks'}, or None if the file does not exist
+        """
+        for entry in self.audio_history:
+            if entry['filename'] == filename and 'peaks' in entry:
+                return {'duration': entry['duration'], 'peaks': entry['peaks']}
+        
+        if not self.file_exists(filename):
+            return None
+        wav, sample_rate = ta.load(self.get_audio_filepath(filename))
+        return waveform_summary(wav, sample_rate)
+    
+    def store_voice_waveform(self, filepath):
+        """
+        Compute a voice recording's waveform summary and store it next to the file.
+        
+        A file that cannot be decoded gets a sidecar recording the error, so
+        it is not decoded again on every voice listing.
+        
+        Args:
+            filepath (str): Path of the saved voice recording
+            
+        Returns:
+            dict or None: {'duration', 'peaks'}, or None if the file cannot be decoded
+        """
+        try:
+            wav, sample_rate = ta.load(filepath)
+            summary = waveform_summary(wav, sample_rate)
+        except Exception as e:
+            print(f"Warning: Could not compute waveform for {filepath}: {e}")
+            summary = {'error': str(e)}
+        
+        try:
+            with open(get_waveform_sidecar_path(filepath), 'w', encoding='utf-8') as f:
+                json.dump(summary, f)
+        except OSError as e:
+            print(f"Warning: Could not store waveform for {filepath}: {e}")
+        return None if 'error' in summary else summary
+    
+    def _read_voice_waveform(self, filepath):
+        """Read a voice recording's stored waveform summary, computing it if missing."""
+        sidecar = get_waveform_sidecar_path(filepath)
+        if not os.path.exists(sidecar):
+            return self.store_voice_waveform(filepath)  # Recorded before summaries were stored
+        try:
+            with open(sidecar, 'r', encoding='utf-8') as f:
+                summary = json.load(f)
+        except (OSError, ValueError):
+            return None
+        return None if 'error' in summary else summary
+    
+    def shutdown(self, timeout=None):
+        """
+        Stop background work and let in-flight synthesis and file writes finish.
+        
+        Args:
+            timeout (float, optional): Maximum seconds to wait for running synthesis
+        """
+        self._stopping.set()  # Stops cache warm-up between phrases
+        if not self.scheduler.wait_idle(timeout):
+            print("Warning: Shutdown timeout reached with synthesis still running")
+        self.output_writer.close()
+    
+    def reload_model(self, checkpoint_dir=None, version=None):
+        """
+        Load a model in the background and hot-swap it in without downtime.
+        
+        The new model is loaded and warmed up while the current one keeps
+        serving. It then becomes current for new requests; generations that
+        already started finish on the old model, whose weights are released
+        once they are done. Cache keys include the model version, so audio
+        from the old model is never served for the new one. On failure the
+        current model stays in place.
+        
+        Args:
+            checkpoint_dir (str, optional): Local checkpoint directory; defaults
+                to the pretrained model
+            version (str, optional): Version label; derived from the checkpoint if omitted
+            
+        Returns:
+            bool: False if a reload is already running
+        """
+        with self._model_lock:
+            if self._swap_thread is not None and self._swap_thread.is_alive():
+                return False
+            self.model_swap_status = {'state': 'loading', 'checkpoint_dir': checkpoint_dir,
+                                      'started': datetime.now().strftime('%Y-%m-%d %H:%M:%S')}
+            self._swap_thread = threading.Thread(target=self._run_model_swap,
+                                                 args=(checkpoint_dir, version),
+                                                 name='model-swap', daemon=True)
+            self._swap_thread.start()
+        return True
+    
+    def _run_model_swap(self, checkpoint_dir, version):
+        """Model reload thread body."""
+        status = self.model_swap_status
+        start_time = time.time()
+        try:
+            version = model_version_for(checkpoint_dir, version)
+            status['version'] = version
+            print(f"Loading model {version} in the background...")
+            model, device = load_model(self.device, checkpoint_dir)
+            self._install_cancellation_hooks(model)
+            loaded = LoadedModel(model, version, device)
+            
+            status['state'] = 'warming'
+            self._warm_model(loaded)
+            
+            old = self._swap_model(loaded)
+            self.checkpoint_dir = checkpoint_dir
+            self.device = device
+            status.update(state='draining', previous_version=old.version if old else None,
+                          swap_seconds=round(time.time() - start_time, 2))
+            
+            if old is not None:
+                status['released'] = self._release_when_idle(old)
+            status['state'] = 'done'
+        
+        except Exception as e:
+            print(f"Error reloading model: {e}")
+            status.update(state='failed', error=str(e))
+    
+    def _warm_model(self, loaded):
+        """
+        Run a short generation on a model before it takes traffic.
+        
+        Raises:
+            RuntimeError: If the model produces no usable audio
+        """
+        with self.scheduler.slot(Config.MODEL_SWAP_PRIORITY, 'model-swap'):
+            with torch.no_grad():
+                wav = loaded.model.generate(Config.MODEL_WARMUP_TEXT)
+        if wav.numel() == 0 or not torch.isfinite(wav).all():
+            raise RuntimeError('Warm-up generation produced no usable audio')
+    
+    def get_model_status(self):
+        """Get the serving model and the progress of the latest reload."""
+        with self._model_lock:
+            current = self._loaded.describe() if self._loaded else None
+        return {
+            'current': current,
+            'version': self.model_version,
+            'reload': dict(self.model_swap_status)
+        }
+    
     def get_device_info(self):
         """Get current device information."""
         return {
             'device': self.device,
             'model_loaded': self._model_loaded,
+            'model_version': self.model_version,
             'cuda_available': torch.cuda.is_available(),
             'mps_available': torch.backends.mps.is_available() if hasattr(torch.backends, 'mps') else False
         }
@@ -216,12 +1160,14 @@ class TTSService:
             if filename.lower().endswith(('.wav', '.mp3', '.m4a')):
                 filepath = os.path.join(voice_clone_dir, filename)
                 stat = os.stat(filepath)
-                voices.append({
+                voice = {
                     'filename': filename,
                     'filepath': filepath,
                     'size': stat.st_size,
                     'created': datetime.fromtimestamp(stat.st_ctime).strftime('%Y-%m-%d %H:%M:%S')
-                })
+                }
+                voice.update(self._read_voice_waveform(filepath) or {})
+                voices.append(voice)
         
         # Sort by creation time, newest first
         voices.sort(key=lambda x: x['created'], reverse=True)
@@ -1,5 +1,10 @@
+import hashlib
+import hmac
+import math
 import os
 import re
+import select
+import socket
 import uuid
 from datetime import datetime
 from flask import jsonify
@@ -49,6 +54,84 @@ def handle_error(message, status_code=500):
     return jsonify({'error': message}), status_code
 
 
+def get_disconnect_checker(environ):
+    """
+    Build a callable that reports whether the HTTP client has disconnected.
+    
+    Uses the disconnect event of the production ASGI front end, or the raw
+    client socket exposed by the WSGI server (Werkzeug and gunicorn both
+    provide one). A socket that is readable but returns no data on a peek
+    has been closed by the peer.
+    
+    Args:
+        environ (dict): WSGI environment of the current request
+        
+    Returns:
+        callable or None: Disconnect check, or None if the server hides the socket
+    """
+    # Production ASGI front end: the server watches the connection for us
+    disconnected = (environ.get('asgi.scope') or {}).get('tts.disconnected')
+    if disconnected is not None:
+        return disconnected.is_set
+    
+    sock = environ.get('werkzeug.socket') or environ.get('gunicorn.socket')
+    if sock is None:
+        return None
+    
+    def is_disconnected():
+        try:
+            readable, _, _ = select.select([sock], [], [], 0)
+            if not readable:
+                return False
+            return sock.recv(1, socket.MSG_PEEK) == b''
+        except (OSError, ValueError):
+            return True
+    
+    return is_disconnected
+
+
+def is_admin_authorized(authorization):
+    """
+    Check a request's Authorization header against the configured admin token.
+    
+    Args:
+        authorization (str): Value of the Authorization header ("Bearer <token>")
+        
+    Returns:
+        bool: True if admin routes are enabled and the token matches
+    """
+    if not Config.ADMIN_TOKEN or not authorization:
+        return False
+    
+    scheme, _, token = authorization.partition(' ')
+    if scheme.lower() != 'bearer':
+        return False
+    return hmac.compare_digest(token.strip().encode('utf-8'), Config.ADMIN_TOKEN.encode('utf-8'))
+
+
+def parse_request_timeout(value, default=None):
+    """
+    Parse a client-requested deadline, clamped to the configured maximum.
+    
+    Args:
+        value: Requested timeout in seconds (number or numeric string), or None
+        default (float, optional): Deadline when none is requested;
+            defaults to Config.REQUEST_TIMEOUT
+        
+    Returns:
+        float: Deadline in seconds
+    """
+    default = default or Config.REQUEST_TIMEOUT
+    try:
+        timeout = float(value)
+    except (TypeError, ValueError):
+        return default
+    
+    if timeout <= 0:
+        return default
+    return min(timeout, Config.MAX_REQUEST_TIMEOUT)
+
+
 def sanitize_text(text):
     """
     Sanitize input text for TTS processing.
@@ -121,6 +204,54 @@ def format_file_size(size_bytes):
     return f"{size_bytes:.1f} {size_names[i]}"
 
 
+def get_output_shard(filename):
+    """
+    Get the hash-prefixed subdirectory an output file is stored in.
+    
+    Args:
+        filename (str): Output filename
+        
+    Returns:
+        str: Shard directory name (hex prefix of the filename hash)
+    """
+    digest = hashlib.md5(filename.encode('utf-8')).hexdigest()
+    return digest[:Config.OUTPUT_SHARD_PREFIX_LEN]
+
+
+def get_output_filepath(filename):
+    """
+    Get the sharded path of an output file.
+    
+    Args:
+        filename (str): Output filename
+        
+    Returns:
+        str: Path inside the output directory's shard subdirectory
+    """
+    return os.path.join(Config.OUTPUT_DIR, get_output_shard(filename), filename)
+
+
+def get_waveform_sidecar_path(filepath):
+    """Get the path of the JSON file holding an audio file's waveform summary."""
+    return filepath + Config.WAVEFORM_SIDECAR_SUFFIX
+
+
+def _iter_output_files(output_dir):
+    """Yield (ctime, path) of audio files in shard directories and legacy flat layout."""
+    shard_len = Config.OUTPUT_SHARD_PREFIX_LEN
+    extension = f'.{Config.AUDIO_FORMAT}'
+    
+    with os.scandir(output_dir) as entries:
+        for entry in entries:
+            if entry.is_file() and entry.name.endswith(extension):
+                yield entry.stat().st_ctime, entry.path
+            elif entry.is_dir() and len(entry.name) == shard_len:
+                with os.scandir(entry.path) as shard:
+                    for item in shard:
+                        if item.is_file() and item.name.endswith(extension):
+                            yield item.stat().st_ctime, item.path
+
+
 def cleanup_temp_files():
     """
     Clean up any temporary files that might be left over.
@@ -131,24 +262,16 @@ def cleanup_temp_files():
         if not os.path.exists(output_dir):
             return
         
-        # Get all audio files
-        audio_files = [f for f in os.listdir(output_dir) 
-                      if f.endswith(f'.{Config.AUDIO_FORMAT}')]
+        # Get all audio files, newest first
+        audio_files = sorted(_iter_output_files(output_dir), reverse=True)
         
         # If there are more files than the max allowed, remove oldest ones
-        if len(audio_files) > Config.MAX_HISTORY_ITEMS:
-            # Sort by creation time
-            audio_files.sort(key=lambda x: os.path.getctime(os.path.join(output_dir, x)))
-            
-            # Remove oldest files
-            files_to_remove = audio_files[:-Config.MAX_HISTORY_ITEMS]
-            for filename in files_to_remove:
-                try:
-                    filepath = os.path.join(output_dir, filename)
-                    os.remove(filepath)
-                    print(f"Cleaned up old audio file: {filename}")
-                except OSError as e:
-                    print(f"Warning: Could not remove file {filename}: {e}")
+        for _, filepath in audio_files[Config.MAX_HISTORY_ITEMS:]:
+            try:
+                os.remove(filepath)
+                print(f"Cleaned up old audio file: {os.path.basename(filepath)}")
+            except OSError as e:
+                print(f"Warning: Could not remove file {filepath}: {e}")
     
     except Exception as e:
         print(f"Error during cleanup: {e}")
@@ -177,6 +300,203 @@ def validate_text_input(text):
     return True, None
 
 
+# Abbreviations that are followed by a capitalized word without ending the sentence
+ABBREVIATIONS = frozenset({
+    'mr', 'mrs', 'ms', 'dr', 'prof', 'sr', 'jr', 'st', 'mt', 'ft', 'vs', 'fig',
+    'gen', 'gov', 'sen', 'rep', 'capt', 'col', 'lt', 'sgt', 'rev', 'hon', 'pres',
+    'jan', 'feb', 'mar', 'apr', 'jun', 'jul', 'aug', 'sep', 'sept', 'oct', 'nov', 'dec',
+})
+
+
+def _compile_sentence_end(abbreviations):
+    """
+    Build the sentence boundary pattern.
+    
+    A boundary is terminal punctuation (plus closing quotes or brackets)
+    followed by whitespace, or a blank line. A single period does not end a
+    sentence after an abbreviation, before a lowercase word, or inside a
+    run of spaced initials ("J. R. R. Tolkien"). A lone capital letter
+    ("plan B.") or a dotted acronym ("the U.S.") ends a sentence as usual.
+    Decimals like "3.5" have no whitespace after the period and never match.
+    All exceptions are fixed-width lookarounds, so the whole scan runs
+    inside the regex engine; the leading lookahead lets it skip ahead to
+    candidate characters instead of trying every alternative at every position.
+    """
+    by_length = {}
+    for abbreviation in abbreviations:
+        for form in (abbreviation, abbreviation.capitalize()):
+            by_length.setdefault(len(form), []).append(re.escape(form))
+    # Initials: the period is followed by another initial, or closes a run of them
+    initials = r'(?!(?<=\b[A-Z]\.)\s+[A-Z]\.)(?<!\b[A-Z]\.\s[A-Z]\.)'
+    guards = initials + ''.join(
+        r'(?<!\b(?:%s)\.)' % '|'.join(sorted(forms)) for _, forms in sorted(by_length.items()))
+    closing = r'["\'\u201d\u2019)\]]*'
+    return re.compile(
+        r'(?=[.!?\n])'
+        r'(?:(?:\.' + guards + r'(?!' + closing + r'\s+[a-z])|[.!?]{2,}|[!?])' + closing + r'\s+'
+        r'|\n\s*\n\s*)'
+    )
+
+
+_SENTENCE_END = _compile_sentence_end(ABBREVIATIONS)
+_CLAUSE_END = re.compile(r'[,;:]\s+')
+
+
+def iter_sentences(text):
+    """
+    Split text into sentences in a single pass.
+    
+    Abbreviations ("Dr. Smith"), spaced initials ("J. R. R. Tolkien"),
+    decimals ("3.5") and lowercase continuations ("e.g. this", "5 p.m. on
+    Monday") do not end a sentence; blank lines do.
+    
+    Args:
+        text (str): Input text
+        
+    Yields:
+        str: Stripped sentences with their punctuation
+    """
+    start = 0
+    for match in _SENTENCE_END.finditer(text):
+        end = match.end()
+        sentence = text[start:end].strip()
+        if sentence:
+            yield sentence
+        start = end
+    
+    sentence = text[start:].strip()
+    if sentence:
+        yield sentence
+
+
+def _split_to_fit(sentence, max_cost, cost):
+    """
+    Break an over-long sentence into pieces of at most max_cost each.
+    
+    The sentence is cut at clause punctuation, and clauses still over the
+    budget at word boundaries. A single word longer than the budget is
+    kept whole.
+    
+    Returns:
+        tuple: (list of pieces, list of their costs)
+    """
+    pieces, costs = [], []
+    start = 0
+    boundaries = [m.end() for m in _CLAUSE_END.finditer(sentence)] + [len(sentence)]
+    for end in boundaries:
+        clause = sentence[start:end].strip()
+        start = end
+        if not clause:
+            continue
+        clause_cost = cost(clause)
+        if clause_cost <= max_cost:
+            pieces.append(clause)
+            costs.append(clause_cost)
+        else:
+            words = clause.split()
+            pieces.extend(words)
+            costs.extend(cost(word) for word in words)
+    return pieces, costs
+
+
+def _balanced_cuts(costs, max_cost, sep_cost):
+    """
+    Group consecutive pieces into chunks of similar cost.
+    
+    The number of chunks is the minimum the budget allows, and each chunk
+    is closed once the next piece would carry it past the average chunk
+    cost by more than half of that piece, so sizes even out instead of
+    leaving a short remainder at the end.
+    
+    Args:
+        costs (list): Cost of each piece
+        max_cost (int): Maximum cost per chunk
+        sep_cost (int): Cost of the space joining two pieces
+        
+    Returns:
+        list: End index (exclusive) of each chunk
+    """
+    total = sum(costs) + sep_cost * (len(costs) - 1)
+    target = total / max(1, math.ceil(total / max_cost))
+    
+    cuts = []
+    group_cost = costs[0]
+    for index in range(1, len(costs)):
+        added = costs[index] + sep_cost
+        if group_cost + added > max_cost or group_cost + added / 2 > target:
+            cuts.append(index)
+            group_cost = costs[index]
+        else:
+            group_cost += added
+    cuts.append(len(costs))
+    return cuts
+
+
+def _join_cuts(pieces, cuts):
+    """Join pieces into chunks at the given cut points."""
+    start = 0
+    for end in cuts:
+        yield ' '.join(pieces[start:end])
+        start = end
+
+
+def iter_text_chunks(text, max_cost=200, cost=len, pack=True, window=None):
+    """
+    Split text into chunks of balanced size for TTS, lazily and in one pass.
+    
+    Size is measured with a cost function: characters by default, or e.g.
+    the number of model text tokens. With pack=True, consecutive sentences
+    are combined into chunks near an even target size; otherwise each
+    sentence is its own chunk and only over-long sentences are divided
+    (into evenly sized pieces). Balancing looks at about `window` chunks'
+    worth of text at a time, so memory stays bounded for arbitrarily large input.
+    
+    Args:
+        text (str): Input text
+        max_cost (int): Maximum cost per chunk
+        cost (callable): Cost of a string, e.g. len or a tokenizer count
+        pack (bool): Whether to combine sentences into chunks
+        window (int, optional): Chunks' worth of text balanced together when
+            packing; defaults to Config.CHUNK_PACK_WINDOW
+        
+    Yields:
+        str: Text chunks
+    """
+    sep_cost = cost(' ')
+    window_cost = (window or Config.CHUNK_PACK_WINDOW) * max_cost
+    pieces, costs = [], []
+    pending_cost = 0
+    
+    for sentence in iter_sentences(text):
+        sentence_cost = cost(sentence)
+        if sentence_cost <= max_cost:
+            if not pack:
+                yield sentence
+                continue
+            pieces.append(sentence)
+            costs.append(sentence_cost)
+            pending_cost += sentence_cost + sep_cost
+        else:
+            sentence_pieces, sentence_costs = _split_to_fit(sentence, max_cost, cost)
+            if not pack:
+                yield from _join_cuts(sentence_pieces, _balanced_cuts(sentence_costs, max_cost, sep_cost))
+                continue
+            pieces.extend(sentence_pieces)
+            costs.extend(sentence_costs)
+            pending_cost += sum(sentence_costs) + sep_cost * len(sentence_costs)
+        
+        if pending_cost >= window_cost:
+            cuts = _balanced_cuts(costs, max_cost, sep_cost)
+            # Hold back the last chunk so it can balance against what follows
+            keep = cuts[-2] if len(cuts) > 1 else 0
+            yield from _join_cuts(pieces, cuts[:-1])
+            pieces, costs = pieces[keep:], costs[keep:]
+            pending_cost = sum(costs) + sep_cost * len(costs)
+    
+    if pieces:
+        yield from _join_cuts(pieces, _balanced_cuts(costs, max_cost, sep_cost))
+
+
 def split_text_into_chunks(text, max_chunk_size=200):
     """
     Split text into logical chunks for streaming TTS.
@@ -190,53 +510,27 @@ def split_text_into_chunks(text, max_chunk_size=200):
     """
     if not text or not text.strip():
         return []
+    return list(iter_text_chunks(text, max_chunk_size))
+
+
+def split_text_into_sentences(text, max_sentence_size=200):
+    """
+    Split text into individual sentences without packing them together.
     
-    # Clean up text
-    text = text.strip()
-    
-    # First, try to split by sentences
-    sentences = re.split(r'([.!?]+)', text)
-    chunks = []
-    current_chunk = ""
+    Sentences longer than max_sentence_size are broken up into evenly
+    sized pieces. Used where each sentence is handled on its own,
+    e.g. for per-sentence audio caching.
     
-    i = 0
-    while i < len(sentences):
-        sentence = sentences[i].strip()
-        
-        # Skip empty sentences
-        if not sentence:
-            i += 1
-            continue
-            
-        # Add punctuation back if it exists
-        if i + 1 < len(sentences) and sentences[i + 1].strip() in ['.', '!', '?', '...']:
-            sentence += sentences[i + 1].strip()
-            i += 1
-        
-        # Check if adding this sentence would exceed max_chunk_size
-        if len(current_chunk) + len(sentence) > max_chunk_size:
-            # If current chunk is not empty, save it
-            if current_chunk.strip():
-                chunks.append(current_chunk.strip())
-                current_chunk = ""
-            
-            # If sentence itself is too long, split it by commas or phrases
-            if len(sentence) > max_chunk_size:
-                sub_chunks = split_long_sentence(sentence, max_chunk_size)
-                chunks.extend(sub_chunks)
-            else:
-                current_chunk = sentence
-        else:
-            current_chunk += " " + sentence if current_chunk else sentence
+    Args:
+        text (str): Input text to split
+        max_sentence_size (int): Maximum characters per sentence piece
         
-        i += 1
-    
-    # Add remaining chunk
-    if current_chunk.strip():
-        chunks.append(current_chunk.strip())
-    
-    # Remove empty chunks and return
-    return [chunk for chunk in chunks if chunk.strip()]
+    Returns:
+        List[str]: List of sentences
+    """
+    if not text or not text.strip():
+        return []
+    return list(iter_text_chunks(text, max_sentence_size, pack=False))
 
 
 def split_long_sentence(sentence, max_size=200):
@@ -253,44 +547,8 @@ def split_long_sentence(sentence, max_size=200):
     if len(sentence) <= max_size:
         return [sentence]
     
-    # Try splitting by commas first
-    parts = re.split(r'([,;:])', sentence)
-    chunks = []
-    current_chunk = ""
-    
-    i = 0
-    while i < len(parts):
-        part = parts[i].strip()
-        
-        if not part:
-            i += 1
-            continue
-        
-        # Add punctuation back if it exists
-        if i + 1 < len(parts) and parts[i + 1].strip() in [',', ';', ':']:
-            part += parts[i + 1].strip()
-            i += 1
-        
-        if len(current_chunk) + len(part) > max_size:
-            if current_chunk.strip():
-                chunks.append(current_chunk.strip())
-                current_chunk = ""
-            
-            # If part is still too long, split by words
-            if len(part) > max_size:
-                word_chunks = split_by_words(part, max_size)
-                chunks.extend(word_chunks)
-            else:
-                current_chunk = part
-        else:
-            current_chunk += " " + part if current_chunk else part
-        
-        i += 1
-    
-    if current_chunk.strip():
-        chunks.append(current_chunk.strip())
-    
-    return [chunk for chunk in chunks if chunk.strip()]
+    pieces, costs = _split_to_fit(sentence.strip(), max_size, len)
+    return list(_join_cuts(pieces, _balanced_cuts(costs, max_size, 1)))
 
 
 def split_by_words(text, max_size=200):
@@ -305,21 +563,9 @@ def split_by_words(text, max_size=200):
         List[str]: List of word chunks
     """
     words = text.split()
-    chunks = []
-    current_chunk = ""
-    
-    for word in words:
-        if len(current_chunk) + len(word) + 1 > max_size:
-            if current_chunk.strip():
-                chunks.append(current_chunk.strip())
-                current_chunk = ""
-        
-        current_chunk += " " + word if current_chunk else word
-    
-    if current_chunk.strip():
-        chunks.append(current_chunk.strip())
-    
-    return [chunk for chunk in chunks if chunk.strip()]
+    if not words:
+        return []
+    return list(_join_cuts(words, _balanced_cuts([len(word) for word in words], max_size, 1)))
 
 
 def estimate_audio_duration(text, words_per_minute=150):